@@ -0,0 +1,56 @@
+"""Compare the hand-written `cd` parser in `helpers` with the `strptime` path.
+
+The benchmark parses every `cd` field of a close approach data file - the full
+`data/cad.json` if it exists, or the test data otherwise - once with
+`datetime.strptime` and once with `helpers.cd_to_datetime`, and prints the best
+time of several repetitions for each.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_cd_to_datetime
+    $ python3 -m benchmarks.bench_cd_to_datetime --cadfile data/cad.json --repeat 10
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import timeit
+
+import helpers
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+DEFAULT_CAD_FILE = PROJECT_ROOT / 'data' / 'cad.json'
+TEST_CAD_FILE = PROJECT_ROOT / 'tests' / 'test-cad-2020.json'
+
+
+def strptime_cd_to_datetime(calendar_date):
+    """Parse a calendar date the way `helpers.cd_to_datetime` used to."""
+    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark parsing of NASA `cd` calendar dates.")
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=DEFAULT_CAD_FILE if DEFAULT_CAD_FILE.exists() else TEST_CAD_FILE,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="The number of times to repeat each measurement.")
+    args = parser.parse_args()
+
+    with open(args.cadfile) as cad_file:
+        dates = [entry[3] for entry in json.load(cad_file)['data']]
+
+    assert all(helpers.cd_to_datetime(cd) == strptime_cd_to_datetime(cd) for cd in dates)
+
+    print(f"Parsing {len(dates)} calendar dates from {args.cadfile}")
+    for label, parse in (('strptime', strptime_cd_to_datetime),
+                         ('cd_to_datetime', helpers.cd_to_datetime)):
+        helpers._cd_date.cache_clear()
+        best = min(timeit.repeat(lambda: [parse(cd) for cd in dates], number=1, repeat=args.repeat))
+        print(f"{label:>16}: {best * 1000:9.2f} ms ({best / len(dates) * 1e9:7.0f} ns per date)")
+
+
+if __name__ == '__main__':
+    main()
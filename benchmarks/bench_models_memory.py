@@ -0,0 +1,111 @@
+"""Measure the memory held by the loaded NEOs and close approaches, and by a database of them.
+
+The benchmark loads the data files - the full `data/` files if they exist, or
+the test data otherwise - and measures the memory allocated for the model
+objects with `tracemalloc`, in three layouts:
+
+- `dict`: replicas of the models with a per-instance `__dict__`, unshared
+  designation strings and a `datetime` per approach (the layout before the
+  models used `__slots__`).
+- `slots`: the slotted models in `models`, storing a `datetime` per approach.
+- `slots+compact`: the slotted models, storing each approach time as minutes.
+
+The two slotted layouts are measured again with a `NEODatabase` built over
+them (`slots+db` and `slots+compact+db`), since the database's indexes hold
+more data per approach, and that's the memory the program actually uses.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_models_memory
+"""
+import argparse
+import pathlib
+import tracemalloc
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from helpers import cd_to_datetime
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+DATA_ROOT = PROJECT_ROOT / 'data'
+TESTS_ROOT = PROJECT_ROOT / 'tests'
+
+
+class DictNearEarthObject:
+    """A near-Earth object, laid out with a per-instance `__dict__`."""
+
+    def __init__(self, neo):
+        """Copy the fields of a slotted `NearEarthObject`, without sharing its designation."""
+        self.designation = ''.join(neo.designation)
+        self.name = neo.name
+        self.diameter = neo.diameter
+        self.hazardous = neo.hazardous
+        self.approaches = []
+
+
+class DictCloseApproach:
+    """A close approach, laid out with a per-instance `__dict__`."""
+
+    def __init__(self, approach, neo):
+        """Copy the fields of a slotted `CloseApproach`, linked to a replica NEO."""
+        self._designation = ''.join(neo.designation)
+        self.time = cd_to_datetime(approach.time.strftime('%Y-%b-%d %H:%M'))
+        self.distance = approach.distance
+        self.velocity = approach.velocity
+        self.neo = neo
+        neo.approaches.append(self)
+
+
+def measure(build):
+    """Return the objects built by `build` and the number of bytes still allocated for them."""
+    tracemalloc.start()
+    try:
+        objects = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return objects, size
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure the memory held by the model objects and database.")
+    default_neofile = DATA_ROOT / 'neos.csv'
+    default_cadfile = DATA_ROOT / 'cad.json'
+    parser.add_argument('--neofile', type=pathlib.Path,
+                        default=default_neofile if default_neofile.exists() else TESTS_ROOT / 'test-neos-2020.csv',
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=default_cadfile if default_cadfile.exists() else TESTS_ROOT / 'test-cad-2020.json',
+                        help="Path to JSON file of close approach data.")
+    args = parser.parse_args()
+
+    neos = load_neos(args.neofile)
+    approaches = load_approaches(args.cadfile)
+    # Only needed to link together these objects, so that the replicas can be linked too.
+    NEODatabase(neos, approaches)
+
+    def build_dict_models():
+        replicas = {id(neo): DictNearEarthObject(neo) for neo in neos}
+        return [DictCloseApproach(approach, replicas[id(approach.neo)])
+                for approach in approaches if approach.neo is not None], replicas
+
+    def build_slotted_models(compact_time, database=False):
+        def build():
+            models = load_neos(args.neofile), load_approaches(args.cadfile, compact_time=compact_time)
+            return NEODatabase(*models) if database else models
+        return build
+
+    print(f"Model memory for {len(neos)} NEOs and {len(approaches)} approaches from {args.cadfile}")
+    for label, build in (('dict', build_dict_models),
+                         ('slots', build_slotted_models(False)),
+                         ('slots+compact', build_slotted_models(True)),
+                         ('slots+db', build_slotted_models(False, database=True)),
+                         ('slots+compact+db', build_slotted_models(True, database=True))):
+        _, size = measure(build)
+        print(f"{label:>16}: {size / 2 ** 20:8.2f} MiB ({size / len(approaches):6.0f} bytes per approach)")
+
+
+if __name__ == '__main__':
+    main()
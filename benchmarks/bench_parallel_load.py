@@ -0,0 +1,53 @@
+"""Compare serial and parallel parsing of a close approach data file.
+
+The benchmark loads the close approach data file - the full `data/cad.json` if
+it exists, or the test data otherwise - with `extract.load_approaches`, once
+serially and then with an increasing number of worker processes, and prints the
+best time of several repetitions for each. The test data is too small to be
+split by default, so the smallest chunk size can be lowered with `--min-chunk`.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_parallel_load
+    $ python3 -m benchmarks.bench_parallel_load --cadfile data/cad.json --jobs 1 2 4 8 16
+"""
+import argparse
+import os
+import pathlib
+import timeit
+
+import extract
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+DEFAULT_CAD_FILE = PROJECT_ROOT / 'data' / 'cad.json'
+TEST_CAD_FILE = PROJECT_ROOT / 'tests' / 'test-cad-2020.json'
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark parallel parsing of close approach data.")
+    parser.add_argument('--cadfile', type=pathlib.Path,
+                        default=DEFAULT_CAD_FILE if DEFAULT_CAD_FILE.exists() else TEST_CAD_FILE,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--jobs', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help="The numbers of worker processes to measure.")
+    parser.add_argument('--min-chunk', type=int, default=extract._MIN_CHUNK_BYTES,
+                        help="The smallest number of bytes worth parsing in a worker process.")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="The number of times to repeat each measurement.")
+    args = parser.parse_args()
+    extract._MIN_CHUNK_BYTES = args.min_chunk
+
+    expected = len(extract.load_approaches(args.cadfile))
+    print(f"Loading {expected} close approaches from {args.cadfile}")
+    for jobs in args.jobs:
+        assert len(extract.load_approaches(args.cadfile, jobs=jobs)) == expected
+        best = min(timeit.repeat(lambda: extract.load_approaches(args.cadfile, jobs=jobs),
+                                 number=1, repeat=args.repeat))
+        print(f"{jobs:>4} jobs: {best * 1000:9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""A columnar query engine that evaluates filters on NumPy arrays.
+
+An `ApproachColumns` holds the fields of every close approach that the filters
+from `create_filters` can test - approach times (as integer minutes since the
+Unix epoch), distances, velocities and the position of each approach's NEO -
+as NumPy arrays, alongside per-NEO arrays of diameters and hazardous flags.
+A collection of filters is evaluated as a vectorized boolean mask over those
+columns, and only the matching `CloseApproach` objects are ever touched.
+
+NumPy is an optional dependency. If it isn't installed, `NEODatabase` simply
+keeps using its pure-Python query path; asking for the columnar engine
+explicitly raises an `ImportError`.
+"""
+from helpers import datetime_to_minutes, minute_bounds
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment.
+    np = None
+
+
+def _in_interval(column, low, high):
+    """Build a boolean mask of the values of `column` that lie in the closed interval `[low, high]`."""
+    if low is not None and high is not None:
+        if low == high:
+            return column == low
+        return (column >= low) & (column <= high)
+    if low is not None:
+        return column >= low
+    return column <= high
+
+
+class ApproachColumns:
+    """A columnar copy of the queryable fields of a collection of close approaches.
+
+    The arrays are built once, after the NEOs and approaches have been linked,
+    and are read-only thereafter.
+    """
+
+    def __init__(self, neos, approaches):
+        """Create a new `ApproachColumns` from linked NEOs and close approaches.
+
+        :param neos: A collection of `NearEarthObject`s.
+        :param approaches: A collection of `CloseApproach`es, linked to their NEOs.
+        :raises ImportError: If NumPy isn't installed.
+        """
+        if np is None:
+            raise ImportError("The columnar query engine requires NumPy.")
+
+        positions = {id(neo): position for position, neo in enumerate(neos)}
+        # The last slot of each per-NEO array stands in for unlinked approaches, which
+        # `linked` rules out of every filter on an NEO's fields.
+        unlinked = len(neos)
+        self.diameters = np.array([neo.diameter for neo in neos] + [float('nan')], dtype=np.float64)
+        self.hazardous = np.array([neo.hazardous for neo in neos] + [False], dtype=np.bool_)
+
+        count = len(approaches)
+        self.times = np.fromiter((datetime_to_minutes(approach.time) for approach in approaches),
+                                 dtype=np.int64, count=count)
+        self.distances = np.fromiter((approach.distance for approach in approaches),
+                                     dtype=np.float64, count=count)
+        self.velocities = np.fromiter((approach.velocity for approach in approaches),
+                                      dtype=np.float64, count=count)
+        self.neo_index = np.fromiter((positions.get(id(approach.neo), unlinked) for approach in approaches),
+                                     dtype=np.int64, count=count)
+        self.linked = self.neo_index != unlinked
+
+    def __len__(self):
+        """Return the number of approaches held in these columns."""
+        return len(self.times)
+
+    def mask(self, filters):
+        """Evaluate a collection of filters as a vectorized mask.
+
+        Filters that can't be expressed as an interval on a known field aren't
+        evaluated here; they're returned so that the caller can check them on
+        the matching approaches.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A tuple of a boolean array over all approaches and the filters left unevaluated.
+        """
+        mask = np.ones(len(self), dtype=np.bool_)
+        neo_mask = None
+        residual = []
+        for approach_filter in filters:
+            interval = approach_filter.interval()
+            if interval is None:
+                residual.append(approach_filter)
+                continue
+            low, high = interval
+            if approach_filter.field == 'time':
+                mask &= _in_interval(self.times, *minute_bounds(low, high))
+            elif approach_filter.field == 'distance':
+                mask &= _in_interval(self.distances, low, high)
+            elif approach_filter.field == 'velocity':
+                mask &= _in_interval(self.velocities, low, high)
+            elif approach_filter.field in ('diameter', 'hazardous'):
+                column = self.diameters if approach_filter.field == 'diameter' else self.hazardous
+                matches = _in_interval(column, low, high)
+                neo_mask = matches if neo_mask is None else neo_mask & matches
+            else:
+                residual.append(approach_filter)
+        if neo_mask is not None:
+            mask &= neo_mask[self.neo_index] & self.linked
+        return mask, tuple(residual)
+
+    def column(self, field):
+        """Return the value of an indexed field for every approach, as an array.
+
+        :param field: One of 'time', 'distance', 'velocity' or 'diameter'.
+        :return: An array holding the field's value for each approach, in internal order.
+        """
+        if field == 'time':
+            return self.times
+        if field == 'distance':
+            return self.distances
+        if field == 'velocity':
+            return self.velocities
+        if field == 'diameter':
+            return self.diameters[self.neo_index]
+        raise KeyError(field)
+
+    def values(self, field, filters):
+        """Select the known values of a field over the approaches that match a collection of filters.
+
+        Unknown values (NaN) are left out. If any filter can't be evaluated as
+        a vectorized mask, nothing is selected, so that the caller can fall
+        back to checking approaches one at a time.
+
+        :param field: One of 'time', 'distance', 'velocity' or 'diameter'.
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: An array of the selected values, or `None`.
+        """
+        mask, residual = self.mask(filters)
+        if residual:
+            return None
+        values = self.column(field)[mask]
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        return values
+
+    def histogram(self, filters, by):
+        """Count the approaches that match a collection of filters in each calendar year or month.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param by: Either 'year' or 'month'.
+        :return: A list of `(label, count)` tuples in chronological order, or `None` if some filter can't be vectorized.
+        """
+        times = self.values('time', filters)
+        if times is None:
+            return None
+        unit = 'datetime64[Y]' if by == 'year' else 'datetime64[M]'
+        buckets, counts = np.unique(times.astype('datetime64[m]').astype(unit), return_counts=True)
+        return [(str(bucket), int(count)) for bucket, count in zip(buckets, counts)]
+
+    def rows(self, filters):
+        """Find the positions of the approaches that pass the vectorized filters.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A tuple of an ascending array of approach positions and the filters left unevaluated.
+        """
+        mask, residual = self.mask(filters)
+        return np.flatnonzero(mask), residual
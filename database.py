@@ -7,12 +7,593 @@ user-specified criteria.
 
 Under normal circumstances, the main module creates one NEODatabase from the
 data on NEOs and close approaches extracted by `extract.load_neos` and
-`extract.load_approaches`.
+`extract.load_approaches`. A long-running process can then apply updates to it
+in place, with `add_neos`, `add_approaches` and `remove_neos`, without loading
+everything again.
 
 You'll edit this file in Tasks 2 and 3.
 """
+import array
+import bisect
+import collections
+import datetime
+import heapq
+import itertools
+import math
+import operator
+import threading
 
-from functools import reduce
+from columnar import ApproachColumns
+from filters import DateFilter, compile_filters, normalize_filters
+from helpers import datetime_to_minutes, minute_bounds, minutes_to_datetime
+from sharded import ShardedExecutor
+
+
+def _approach_diameter(approach):
+    """Return the diameter of an approach's NEO, or NaN if it isn't linked."""
+    return approach.neo.diameter if approach.neo else math.nan
+
+
+def _approach_minutes(approach):
+    """Return an approach's time as a count of minutes since the Unix epoch, without building a `datetime`."""
+    time = approach._time
+    return time if type(time) is int else datetime_to_minutes(time)
+
+
+# Functions that fetch the value of each indexed field from a `CloseApproach`.
+_INDEXED_FIELDS = {
+    'time': lambda approach: approach.time,
+    'distance': lambda approach: approach.distance,
+    'velocity': lambda approach: approach.velocity,
+    'diameter': _approach_diameter,
+}
+
+# Functions that fetch the key of each approach in the sorted index of each field.
+# Times are keyed by their count of minutes since the Unix epoch, which sorts the
+# same way, and is stored in an array rather than as a `datetime` per approach.
+_INDEX_KEYS = dict(_INDEXED_FIELDS, time=_approach_minutes)
+
+# The array typecodes of the sorted indexes whose keys aren't kept in a list.
+_INDEX_TYPECODES = {'time': 'q'}
+
+# The number of minutes in a day, and the day ordinal of the Unix epoch.
+_DAY_MINUTES = 24 * 60
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# Functions that fetch the value of each low-cardinality field from a `CloseApproach`.
+# The planner keeps a count of each distinct value to estimate selectivity, and a
+# bitmap of the approaches with each value to answer filters on the field.
+_COUNTED_FIELDS = {
+    'hazardous': lambda approach: approach.neo.hazardous if approach.neo else None,
+}
+
+# The fraction of approaches assumed to pass a filter that no statistics describe.
+_DEFAULT_SELECTIVITY = 1 / 3
+
+# The fraction of all approaches above which a streaming query scans the whole
+# table in internal order, rather than sorting the positions of its index range.
+_FULL_SCAN_FRACTION = 1 / 2
+
+# The default total number of approach positions held by the query result cache.
+_CACHE_ROWS = 1 << 20
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'rows', 'max_rows'])
+
+
+def _bucket(time, by):
+    """Find the calendar bucket of a time, and the first time of the next bucket.
+
+    :param time: A `datetime`.
+    :param by: Either 'year' or 'month'.
+    :return: A tuple of the bucket's label (such as '2020' or '2020-03') and the start of the next bucket.
+    """
+    if by == 'year':
+        return f"{time.year:04d}", datetime.datetime(time.year + 1, 1, 1)
+    if by == 'month':
+        year, month = divmod(time.year * 12 + time.month, 12)
+        return f"{time.year:04d}-{time.month:02d}", datetime.datetime(year, month + 1, 1)
+    raise ValueError(f"Unsupported histogram bucket {by!r}; use 'year' or 'month'.")
+
+
+class _SortedIndex:
+    """A sorted index from the values of one field to the positions of approaches.
+
+    The index holds two parallel lists: `keys`, the field values in ascending
+    order, and `rows`, the position in `NEODatabase._approaches` of the approach
+    that each key came from. Values that compare unequal to themselves (NaN,
+    such as unknown diameters) are left out, since no filter can match them;
+    their positions are kept in `unknown`, in internal order.
+
+    Integer keys can be stored in an `array.array` instead of a list, so that
+    each takes a fixed number of bytes rather than an object of its own.
+    """
+
+    def __init__(self, values, rows=None, typecode=None):
+        """Create a new `_SortedIndex` over a sequence of field values.
+
+        :param values: The field value of each approach, in internal order.
+        :param rows: The positions of the indexed approaches in sorted order, if already known.
+        :param typecode: The `array` typecode in which to store the keys, or `None` to store them in a list.
+        """
+        if rows is None:
+            rows = [row for row, value in enumerate(values) if value == value]
+            rows.sort(key=values.__getitem__)
+        self.rows = list(rows)
+        keys = (values[row] for row in rows)
+        self.keys = list(keys) if typecode is None else array.array(typecode, keys)
+        self.unknown = [row for row, value in enumerate(values) if value != value]
+
+    def __len__(self):
+        """Return the number of indexed approaches."""
+        return len(self.rows)
+
+    def span(self, low=None, high=None):
+        """Find the slice of the index whose keys lie in the closed interval `[low, high]`.
+
+        :param low: The smallest key to include, or `None` for no lower bound.
+        :param high: The largest key to include, or `None` for no upper bound.
+        :return: A `(start, stop)` tuple of positions into `keys` and `rows`.
+        """
+        start = 0 if low is None else bisect.bisect_left(self.keys, low)
+        stop = len(self.keys) if high is None else bisect.bisect_right(self.keys, high)
+        return start, max(start, stop)
+
+    def insert(self, rows, values):
+        """Add approaches to the index.
+
+        The new entries are merged into the index in a single pass, which
+        copies each existing entry once, rather than shifting the entries
+        after each insertion point in turn.
+
+        :param rows: The positions of the approaches, past the end of those already indexed.
+        :param values: The approaches' values of the indexed field.
+        """
+        new = []
+        for row, value in zip(rows, values):
+            if value == value:
+                new.append((value, row))
+            else:
+                self.unknown.append(row)
+        if not new:
+            return
+        new.sort()
+        keys, rows = self.keys[:0], []
+        previous = 0
+        for value, row in new:
+            position = bisect.bisect_right(self.keys, value, previous)
+            keys += self.keys[previous:position]
+            rows += self.rows[previous:position]
+            keys.append(value)
+            rows.append(row)
+            previous = position
+        self.keys = keys + self.keys[previous:]
+        self.rows = rows + self.rows[previous:]
+
+    def delete(self, rows, values):
+        """Remove approaches from the index.
+
+        :param rows: The positions of the approaches.
+        :param values: The approaches' values of the indexed field.
+        """
+        for row, value in zip(rows, values):
+            if value != value:
+                del self.unknown[bisect.bisect_left(self.unknown, row)]
+                continue
+            position = bisect.bisect_left(self.keys, value)
+            while self.rows[position] != row:
+                position += 1
+            del self.keys[position]
+            del self.rows[position]
+
+    def move(self, row, target, value):
+        """Move an indexed approach to a new position, keeping its place in the index.
+
+        :param row: The position of the approach.
+        :param target: The new position of the approach.
+        :param value: The approach's value of the indexed field.
+        """
+        if value != value:
+            del self.unknown[bisect.bisect_left(self.unknown, row)]
+            bisect.insort(self.unknown, target)
+            return
+        position = bisect.bisect_left(self.keys, value)
+        while self.rows[position] != row:
+            position += 1
+        self.rows[position] = target
+
+
+class _CalendarIndex:
+    """An index from calendar days to slices of the sorted time index.
+
+    Since the time index is sorted, the approaches on any range of days form a
+    contiguous slice of it. `starts` holds, for each day from the first to the
+    last approach, the position in the time index of the first approach on or
+    after that day, followed by the length of the index; so a range of days is
+    resolved to a slice with two array lookups, by day ordinal, without any
+    `datetime` comparisons.
+    """
+
+    def __init__(self, index):
+        """Create a new `_CalendarIndex` over a sorted index of approach times.
+
+        :param index: The `_SortedIndex` of the `time` field, keyed by minutes since the Unix epoch.
+        """
+        keys = index.keys
+        self.first = _day(keys[0]) if keys else 0
+        self.starts = array.array('q', [0])
+        if keys:
+            position = 0
+            for day in range(self.first + 1, _day(keys[-1]) + 2):
+                position = bisect.bisect_left(keys, (day - _EPOCH_ORDINAL) * _DAY_MINUTES, position)
+                self.starts.append(position)
+
+    def span(self, low=None, high=None):
+        """Find the slice of the time index whose approaches fall on the days in `[low, high]`.
+
+        :param low: The ordinal of the first day to include, or `None` for no lower bound.
+        :param high: The ordinal of the last day to include, or `None` for no upper bound.
+        :return: A `(start, stop)` tuple of positions into the time index.
+        """
+        days = len(self.starts) - 1
+        low = 0 if low is None else min(max(low - self.first, 0), days)
+        high = days if high is None else min(max(high + 1 - self.first, 0), days)
+        start, stop = self.starts[low], self.starts[high]
+        return start, max(start, stop)
+
+    def insert(self, days):
+        """Account for approaches added to the time index on some days, given by ordinal."""
+        self._shift(days, 1)
+
+    def delete(self, days):
+        """Account for approaches removed from the time index on some days, given by ordinal."""
+        self._shift(days, -1)
+
+    def _shift(self, days, step):
+        """Move the start of every day after each of some days by a number of positions."""
+        days = list(days)
+        if not days:
+            return
+        low, high = min(days), max(days)
+        if len(self.starts) == 1:
+            self.first = low
+        if low < self.first:
+            self.starts = array.array('q', [0]) * (self.first - low) + self.starts
+            self.first = low
+        last = self.first + len(self.starts) - 2
+        if high > last:
+            self.starts.extend(itertools.repeat(self.starts[-1], high - last))
+        shifts = [0] * len(self.starts)
+        for day in days:
+            shifts[day + 1 - self.first] += step
+        self.starts = array.array('q', map(operator.add, self.starts, itertools.accumulate(shifts)))
+
+
+def _day(minutes):
+    """Return the ordinal of the day holding a count of minutes since the Unix epoch."""
+    return minutes // _DAY_MINUTES + _EPOCH_ORDINAL
+
+
+# The positions of the set bits in each possible byte, for iterating over a `_Bitmap`.
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+class _Bitmap:
+    """A set of approach positions, stored as one bit per approach in a `bytearray`.
+
+    Bit `row % 8` of byte `row // 8` is set if the approach at position `row`
+    of `NEODatabase._approaches` is in the set. Bitmaps over the same approaches
+    are intersected and united a whole machine word at a time, by way of
+    Python's arbitrary-precision integers, and membership is a single byte
+    lookup, so a candidate can be ruled out without touching its approach.
+    """
+    __slots__ = ('bits',)
+
+    def __init__(self, size, rows=()):
+        """Create a new `_Bitmap` of a given size.
+
+        :param size: The number of approaches.
+        :param rows: The positions of the approaches in the set.
+        """
+        bits = self.bits = bytearray((size + 7) // 8)
+        for row in rows:
+            bits[row >> 3] |= 1 << (row & 7)
+
+    def _combine(self, other, op):
+        """Build a bitmap from a bitwise operation on this bitmap and another of the same size."""
+        value = op(int.from_bytes(self.bits, 'little'), int.from_bytes(other.bits, 'little'))
+        result = _Bitmap(0)
+        result.bits = bytearray(value.to_bytes(len(self.bits), 'little'))
+        return result
+
+    def __and__(self, other):
+        """Return `self & other`, the approaches in both bitmaps."""
+        return self._combine(other, operator.and_)
+
+    def __or__(self, other):
+        """Return `self | other`, the approaches in either bitmap."""
+        return self._combine(other, operator.or_)
+
+    def resize(self, size):
+        """Make room for approaches up to a new, larger size, outside the set."""
+        self.bits.extend(bytes((size + 7) // 8 - len(self.bits)))
+
+    def add(self, row):
+        """Add the approach at a position to the set."""
+        self.bits[row >> 3] |= 1 << (row & 7)
+
+    def discard(self, row):
+        """Remove the approach at a position from the set, if it's there."""
+        self.bits[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+
+    def move(self, row, target):
+        """Put the approach at a new position in the set if the one at `row` is, and discard `row`."""
+        if row in self:
+            self.add(target)
+        else:
+            self.discard(target)
+        self.discard(row)
+
+    def truncate(self, size):
+        """Drop the room for approaches past a new, smaller size, which must not be in the set."""
+        del self.bits[(size + 7) // 8:]
+
+    def __contains__(self, row):
+        """Return whether the approach at a position is in the set."""
+        return self.bits[row >> 3] >> (row & 7) & 1
+
+    def __len__(self):
+        """Return the number of approaches in the set."""
+        return bin(int.from_bytes(self.bits, 'little')).count('1')
+
+    def __iter__(self):
+        """Generate the positions of the approaches in the set, in internal order."""
+        for byte, value in enumerate(self.bits):
+            if value:
+                base = byte << 3
+                for bit in _BYTE_BITS[value]:
+                    yield base + bit
+
+
+def _trigrams(text):
+    """Return the set of three-character substrings of a casefolded, padded string."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _name_key(neo):
+    """Return the key that orders a named NEO in a `_NameIndex`: its casefolded name, then its name and designation."""
+    return neo.name.casefold(), neo.name, neo.designation
+
+
+class _NameIndex:
+    """A search index over the names of NEOs.
+
+    The keys of the named NEOs (see `_name_key`) are kept in sorted order, in
+    the parallel lists `keys` and `neos`, so that the names that start with a
+    prefix form a contiguous slice found by binary search. Each name is also
+    broken into trigrams, and `postings` maps each trigram to the NEOs whose
+    names contain it, so that names similar to a misspelling can be found
+    without comparing it to every name.
+    """
+
+    # The smallest fraction of trigrams that a fuzzy match must share with the query.
+    threshold = 0.3
+
+    def __init__(self, neos):
+        """Create a new `_NameIndex` over the named NEOs in a collection.
+
+        :param neos: A collection of `NearEarthObject`s.
+        """
+        named = sorted((_name_key(neo), neo) for neo in neos if neo.name)
+        self.keys = [key for key, _ in named]
+        self.neos = [neo for _, neo in named]
+        self.postings = collections.defaultdict(list)
+        self.sizes = {}
+        for neo in self.neos:
+            self._post(neo)
+
+    def _post(self, neo):
+        """Add a named NEO to the postings of its name's trigrams."""
+        trigrams = _trigrams(neo.name.casefold())
+        self.sizes[neo] = len(trigrams)
+        for trigram in trigrams:
+            self.postings[trigram].append(neo)
+
+    def insert(self, neo):
+        """Add an NEO to the index, if it has a name."""
+        if not neo.name:
+            return
+        key = _name_key(neo)
+        position = bisect.bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.neos.insert(position, neo)
+        self._post(neo)
+
+    def delete(self, neo):
+        """Remove an NEO from the index, if it has a name."""
+        if not neo.name:
+            return
+        position = bisect.bisect_left(self.keys, _name_key(neo))
+        while self.neos[position] is not neo:
+            position += 1
+        del self.keys[position]
+        del self.neos[position]
+        del self.sizes[neo]
+        for trigram in _trigrams(neo.name.casefold()):
+            posting = self.postings[trigram]
+            posting.remove(neo)
+            if not posting:
+                del self.postings[trigram]
+
+    def prefix(self, text):
+        """Generate the NEOs whose names start with some text, ignoring case, in alphabetical order."""
+        text = text.casefold()
+        position = bisect.bisect_left(self.keys, (text,))
+        while position < len(self.keys) and self.keys[position][0].startswith(text):
+            yield self.neos[position]
+            position += 1
+
+    def fuzzy(self, text):
+        """Find the NEOs whose names are similar to some text, most similar first.
+
+        Similarity is the Jaccard index of the two names' sets of trigrams, and
+        NEOs that are equally similar are listed in alphabetical order.
+
+        :return: A list of matching `NearEarthObject`s.
+        """
+        trigrams = _trigrams(text.casefold())
+        shared = collections.Counter()
+        for trigram in trigrams:
+            shared.update(self.postings.get(trigram, ()))
+        scores = []
+        for neo, count in shared.items():
+            similarity = count / (len(trigrams) + self.sizes[neo] - count)
+            if similarity >= self.threshold:
+                scores.append((-similarity, _name_key(neo), neo))
+        scores.sort(key=lambda score: score[:2])
+        return [neo for *_, neo in scores]
+
+
+class _ResultCache:
+    """A bounded LRU cache from normalized filter sets to matching approach positions.
+
+    The cache is bounded by the total number of approach positions it holds,
+    rather than by the number of queries, so that one broad query can't pin
+    an unbounded amount of memory. The least recently used results are evicted
+    first, and a result larger than the whole cache is never stored. The cache
+    may be shared by queries running in several threads.
+    """
+
+    def __init__(self, max_rows):
+        """Create a new, empty `_ResultCache`.
+
+        :param max_rows: The maximum total number of approach positions to hold.
+        """
+        self.max_rows = max_rows
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached positions for a normalized filter set, or `None`, counting a hit or miss."""
+        with self._lock:
+            rows = self._results.get(key)
+            if rows is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, key, rows):
+        """Store the positions matching a normalized filter set, evicting older results as needed."""
+        with self._lock:
+            if len(rows) > self.max_rows or key in self._results:
+                return
+            while self._results and self.rows + len(rows) > self.max_rows:
+                _, evicted = self._results.popitem(last=False)
+                self.rows -= len(evicted)
+            self._results[key] = rows
+            self.rows += len(rows)
+
+    def clear(self):
+        """Remove every cached result, keeping the hit and miss counters."""
+        with self._lock:
+            self._results.clear()
+            self.rows = 0
+
+
+class QueryPlan:
+    """A plan for executing a query, as chosen by `NEODatabase`.
+
+    A plan scans the candidate approaches produced by a `driver` - either a
+    range of one field's sorted index, or the whole table if no filter can use
+    an index - and checks the `residual` filters on each candidate, most
+    selective first, so that evaluation short-circuits as early as possible.
+
+    Filters on low-cardinality fields, and the requirement that a filtered
+    field's value be known, are answered by a `bitmap` of approach positions
+    instead. Candidates outside the bitmap are skipped before their approaches
+    are touched; if no index range is narrower, the bitmap itself drives the
+    scan.
+    """
+
+    def __init__(self, driver, index, span, residual, selectivities, total,
+                 bitmap=None, bitmapped=(), known=()):
+        """Create a new `QueryPlan`.
+
+        :param driver: The name of the indexed field that drives the scan, or `None` for a full or bitmap scan.
+        :param index: The `_SortedIndex` of the driving field, or `None` for a full or bitmap scan.
+        :param span: The `(start, stop)` slice of the index holding the candidates, or `(0, total)` otherwise.
+        :param residual: The filters left to check on each candidate, in evaluation order.
+        :param selectivities: The estimated fraction of candidates that pass each residual filter.
+        :param total: The number of approaches in the database.
+        :param bitmap: A `_Bitmap` of the positions that every match must have, or `None`.
+        :param bitmapped: Pairs of the filters answered by `bitmap` and their selectivities.
+        :param known: The names of the fields whose values `bitmap` requires to be known.
+        """
+        self.driver = driver
+        self.index = index
+        self.span = span
+        self.residual = residual
+        self.selectivities = selectivities
+        self.total = total
+        self.bitmap = bitmap
+        self.bitmapped = bitmapped
+        self.known = known
+        self._rows = None
+
+    def __len__(self):
+        """Return the number of candidate approaches produced by the driver."""
+        if self.index is None and self.bitmap is not None:
+            return len(self.bitmap)
+        start, stop = self.span
+        return stop - start
+
+    @property
+    def rows(self):
+        """Return the positions of the candidate approaches that are in the bitmap, in internal order."""
+        if self._rows is None:
+            if self.index is None:
+                self._rows = range(self.total) if self.bitmap is None else self.bitmap
+            else:
+                start, stop = self.span
+                rows = sorted(self.index.rows[start:stop])
+                if self.bitmap is not None:
+                    bitmap = self.bitmap
+                    rows = [row for row in rows if row in bitmap]
+                self._rows = rows
+        return self._rows
+
+    @property
+    def estimate(self):
+        """Return the estimated number of matching approaches, assuming independent filters."""
+        estimate = len(self)
+        if self.index is not None:
+            for _, selectivity in self.bitmapped:
+                estimate *= selectivity
+        for selectivity in self.selectivities:
+            estimate *= selectivity
+        return round(estimate)
+
+    def __str__(self):
+        """Return `str(self)`, a human-readable description of this plan."""
+        if self.driver:
+            lines = [f"Index range scan on '{self.driver}': {len(self)} of {self.total} approaches"]
+        elif self.bitmap is not None:
+            lines = [f"Bitmap scan: {len(self)} of {self.total} approaches"]
+        else:
+            lines = [f"Full scan: {self.total} approaches"]
+        for approach_filter, selectivity in self.bitmapped:
+            lines.append(f"  Bitmap {approach_filter!r} (selectivity {selectivity:.4f})")
+        for field in self.known:
+            lines.append(f"  Bitmap of known '{field}' values")
+        for approach_filter, selectivity in zip(self.residual, self.selectivities):
+            lines.append(f"  Check {approach_filter!r} (selectivity {selectivity:.4f})")
+        lines.append(f"Estimated matches: {self.estimate}")
+        return '\n'.join(lines)
 
 
 class NEODatabase:
@@ -24,7 +605,7 @@ class NEODatabase:
     querying for close approaches that match criteria.
     """
 
-    def __init__(self, neos, approaches):
+    def __init__(self, neos, approaches, columnar=False, indexes=None, cache_rows=_CACHE_ROWS):
         """Create a new `NEODatabase`.
 
         As a precondition, this constructor assumes that the collections of NEOs
@@ -39,35 +620,259 @@ class NEODatabase:
         a collection of that NEO's close approaches, and the `.neo` attribute of
         each close approach references the appropriate NEO.
 
+        If `columnar` is set, the queryable fields of every approach are also
+        copied into NumPy arrays, and queries are evaluated as vectorized masks
+        over them (see `columnar.ApproachColumns`).
+
+        The sorted indexes are built from scratch unless `indexes` supplies the
+        sorted order of approach positions for each indexed field, as saved in
+        a snapshot (see `snapshot.save_snapshot`).
+
         :param neos: A collection of `NearEarthObject`s.
         :param approaches: A collection of `CloseApproach`es.
+        :param columnar: Whether to answer queries with the NumPy columnar engine.
+        :param indexes: A mapping from indexed field names to sequences of approach positions in sorted order.
+        :param cache_rows: The maximum total number of approach positions held by the query result cache.
+        :raises ImportError: If `columnar` is set but NumPy isn't installed.
         """
-        self._neos = neos
-        self._approaches = approaches
+        self._neos = dict()
         self._neo_name_map = dict()
-        self._neo_designation_map = dict()
+        for neo in neos:
+            self._index_neo(neo)
+        self._names = _NameIndex(self._neos.values())
+        self._approaches = list(approaches)
+        self._indexes = dict()
+
+        self._unlinked = collections.defaultdict(list)
+        for approach in self._approaches:
+            self._link(approach)
+        for neo in self._neos.values():
+            neo.summarize()
 
-        for neo in self._neos:
-            self._neo_designation_map[neo.designation.lower()] = neo
+        indexes = indexes or {}
+        for field, get in _INDEX_KEYS.items():
+            self._indexes[field] = _SortedIndex([get(approach) for approach in self._approaches],
+                                                indexes.get(field), _INDEX_TYPECODES.get(field))
+        self._count_values()
+        self._calendar = _CalendarIndex(self._indexes['time'])
+        self._columns = ApproachColumns(self._neos.values(), self._approaches) if columnar else None
+        self._cache = _ResultCache(cache_rows)
+        self._shards = None
+        self._shards_lock = threading.Lock()
 
-            if not neo.name:
-                continue
-            if neo.name:
-                neo_lower_name = neo.name.lower()
-                if self._neo_name_map.get(neo_lower_name):
-                    self._neo_name_map[neo_lower_name].append(neo)
-                else:
-                    self._neo_name_map[neo_lower_name] = [neo]
+    def _index_neo(self, neo):
+        """Add an NEO to the lookups by primary designation and by name, replacing any with its designation.
 
-        for approach in self._approaches:
-            neo_designation = approach._designation
-            if not neo_designation:
-                continue
-            neo = self.get_neo_by_designation(neo_designation.lower())
-            if not neo:
+        The NEOs are kept in `_neos`, by lowercase primary designation, so that
+        one can be found or removed without scanning the others. The name index
+        is updated separately, since it's built in bulk by the constructor.
+        """
+        previous = self._neos.get(neo.designation.lower())
+        if previous is not None:
+            self._unindex_neo(previous)
+        self._neos[neo.designation.lower()] = neo
+        if neo.name:
+            self._neo_name_map.setdefault(neo.name.lower(), []).append(neo)
+
+    def _unindex_neo(self, neo):
+        """Remove an NEO from the lookups by primary designation and by name."""
+        del self._neos[neo.designation.lower()]
+        if neo.name:
+            named = self._neo_name_map[neo.name.lower()]
+            named.remove(neo)
+            if not named:
+                del self._neo_name_map[neo.name.lower()]
+
+    def _link(self, approach):
+        """Link a close approach and its NEO, or remember it as unlinked if that NEO isn't in the database."""
+        neo_designation = approach._designation
+        neo = self.get_neo_by_designation(neo_designation) if neo_designation else None
+        if not neo:
+            self._unlinked[(neo_designation or '').lower()].append(approach)
+            return
+        approach.neo = neo
+        neo.add_approach(approach)
+
+    def _count_values(self):
+        """Build the value counts and bitmaps of the low-cardinality fields, and the bitmaps of known values."""
+        total = len(self._approaches)
+        self._value_counts = dict()
+        self._bitmaps = dict()
+        for field, get in _COUNTED_FIELDS.items():
+            positions = collections.defaultdict(list)
+            for row, approach in enumerate(self._approaches):
+                positions[get(approach)].append(row)
+            self._value_counts[field] = collections.Counter({value: len(rows) for value, rows in positions.items()})
+            self._bitmaps[field] = {value: _Bitmap(total, rows)
+                                    for value, rows in positions.items() if value is not None}
+        self._known = {field: _Bitmap(total, index.rows)
+                       for field, index in self._indexes.items() if index.unknown}
+
+    def add_neos(self, neos):
+        """Add NEOs to the database, or replace the NEOs with the same primary designations.
+
+        The close approaches already in the database whose designations match
+        an added NEO - either the approaches of the NEO it replaces, or ones
+        that were added before it - are linked to it.
+
+        Like `add_approaches` and `remove_neos`, this updates the lookups and
+        indexes in place, at a cost that depends on the size of the change
+        rather than of the database. It must not run while another thread is
+        querying the database.
+
+        :param neos: A collection of `NearEarthObject`s, whose approaches haven't yet been linked.
+        """
+        neos = list(neos)
+        relinked = self._approaches_of({neo.designation.lower() for neo in neos})
+        self._remove_approaches(relinked)
+        for neo in neos:
+            previous = self._neos.get(neo.designation.lower())
+            if previous is not None:
+                self._names.delete(previous)
+            self._index_neo(neo)
+            self._names.insert(neo)
+        self.add_approaches(relinked)
+
+    def add_approaches(self, approaches):
+        """Add close approaches to the database, and link them to their NEOs.
+
+        The new approaches are placed after the others in internal order, and
+        merged into the sorted indexes, calendar and bitmaps. Each NEO's
+        approaches stay sorted by time. Cached query results are discarded.
+
+        :param approaches: A collection of `CloseApproach`es, not yet linked to their NEOs.
+        """
+        approaches = list(approaches)
+        if not approaches:
+            return
+        start = len(self._approaches)
+        self._approaches.extend(approaches)
+        total = len(self._approaches)
+        rows = range(start, total)
+        linked = {}
+        for approach in approaches:
+            self._link(approach)
+            if approach.neo is not None:
+                linked[id(approach.neo)] = approach.neo
+        # Keep each NEO's approaches in time order, as the constructor leaves them.
+        for neo in linked.values():
+            neo.summarize()
+
+        for field, get in _INDEX_KEYS.items():
+            self._indexes[field].insert(rows, [get(approach) for approach in approaches])
+        self._calendar.insert(_day(_approach_minutes(approach)) for approach in approaches)
+        for field, get in _COUNTED_FIELDS.items():
+            bitmaps = self._bitmaps[field]
+            for bitmap in bitmaps.values():
+                bitmap.resize(total)
+            for row, approach in zip(rows, approaches):
+                value = get(approach)
+                self._value_counts[field][value] += 1
+                if value is not None:
+                    if value not in bitmaps:
+                        bitmaps[value] = _Bitmap(total)
+                    bitmaps[value].add(row)
+        for field, index in self._indexes.items():
+            if field not in self._known:
+                if index.unknown:
+                    self._known[field] = _Bitmap(total, index.rows)
                 continue
-            approach.neo = neo
-            neo.add_approach(approach)
+            known = self._known[field]
+            known.resize(total)
+            get = _INDEXED_FIELDS[field]
+            for row, approach in zip(rows, approaches):
+                value = get(approach)
+                if value == value:
+                    known.add(row)
+        self._refresh()
+
+    def remove_neos(self, designations):
+        """Remove NEOs, and all of their close approaches, from the database.
+
+        :param designations: A collection of primary designations of the NEOs to remove.
+        :return: A list of the removed `NearEarthObject`s.
+        """
+        designations = dict.fromkeys(designation.lower() for designation in designations)
+        self._remove_approaches(self._approaches_of(designations))
+        removed = []
+        for designation in designations:
+            neo = self._neos.get(designation)
+            if neo is not None:
+                self._unindex_neo(neo)
+                self._names.delete(neo)
+                removed.append(neo)
+        return removed
+
+    def _approaches_of(self, designations):
+        """List the close approaches, linked or not, with any of a set of lowercase designations."""
+        approaches = []
+        for designation in designations:
+            neo = self._neos.get(designation)
+            if neo is not None:
+                approaches.extend(neo.approaches)
+            if designation:
+                approaches.extend(self._unlinked.get(designation, ()))
+        return approaches
+
+    def _row(self, approach):
+        """Find the position of a close approach in the database, with a binary search on the time index."""
+        index = self._indexes['time']
+        position = bisect.bisect_left(index.keys, _approach_minutes(approach))
+        while self._approaches[index.rows[position]] is not approach:
+            position += 1
+        return index.rows[position]
+
+    def _remove_approaches(self, approaches):
+        """Remove close approaches from the database, and unlink them from their NEOs.
+
+        Each removed approach is replaced by the last approach in internal
+        order, so only the entries of the moved approaches change, in every
+        index and bitmap, and nothing has to be sorted or renumbered.
+        """
+        if not approaches:
+            return
+        rows = sorted(self._row(approach) for approach in approaches)
+        removed = [self._approaches[row] for row in rows]
+        for field, get in _INDEX_KEYS.items():
+            self._indexes[field].delete(rows, [get(approach) for approach in removed])
+        self._calendar.delete(_day(_approach_minutes(approach)) for approach in removed)
+        for field, get in _COUNTED_FIELDS.items():
+            for approach in removed:
+                self._value_counts[field][get(approach)] -= 1
+        bitmaps = [bitmap for field in self._bitmaps for bitmap in self._bitmaps[field].values()]
+        bitmaps.extend(self._known.values())
+
+        for row, approach in zip(reversed(rows), reversed(removed)):
+            last = len(self._approaches) - 1
+            if row == last:
+                for bitmap in bitmaps:
+                    bitmap.discard(row)
+            else:
+                moved = self._approaches[row] = self._approaches[last]
+                for field, get in _INDEX_KEYS.items():
+                    self._indexes[field].move(last, row, get(moved))
+                for bitmap in bitmaps:
+                    bitmap.move(last, row)
+            self._approaches.pop()
+            if approach.neo is None:
+                unlinked = self._unlinked[(approach._designation or '').lower()]
+                unlinked.remove(approach)
+                if not unlinked:
+                    del self._unlinked[(approach._designation or '').lower()]
+            else:
+                approach.neo.remove_approach(approach)
+                approach.neo = None
+        for bitmap in bitmaps:
+            bitmap.truncate(len(self._approaches))
+        self._refresh()
+
+    def _refresh(self):
+        """Discard everything that holds a copy of the approaches, after approaches were added or removed."""
+        self._cache.clear()
+        if self._columns is not None:
+            self._columns = ApproachColumns(self._neos.values(), self._approaches)
+        # The worker processes hold a copy of the old approaches; they're started again when needed.
+        self.close()
 
     def get_neo_by_designation(self, designation):
         """Find and return an NEO by its primary designation.
@@ -82,7 +887,7 @@ class NEODatabase:
         :param designation: The primary designation of the NEO to search for.
         :return: The `NearEarthObject` with the desired primary designation, or `None`.
         """
-        neo = self._neo_designation_map.get(designation.lower())
+        neo = self._neos.get(designation.lower())
         return neo
 
     def get_neo_by_name(self, name):
@@ -104,7 +909,34 @@ class NEODatabase:
             return None
         return neos[0]
 
-    def query(self, filters=()):
+    def search_neos(self, prefix=None, fuzzy=None, limit=10):
+        """Search for NEOs by partial or misspelled name.
+
+        The matching ignores case. NEOs whose names start with `prefix` come
+        first, in alphabetical order; then NEOs whose names are similar to
+        `fuzzy`, most similar first. Each NEO is only listed once.
+
+        :param prefix: The start of the names to search for, or `None`.
+        :param fuzzy: An approximate name to search for, or `None`.
+        :param limit: The maximum number of NEOs to return, or `None` for no limit.
+        :return: A list of matching `NearEarthObject`s.
+        :raises ValueError: If neither `prefix` nor `fuzzy` is given.
+        """
+        if prefix is None and fuzzy is None:
+            raise ValueError("Either a prefix or a fuzzy name is required.")
+        matches = itertools.chain(self._names.prefix(prefix) if prefix is not None else (),
+                                  self._names.fuzzy(fuzzy) if fuzzy is not None else ())
+        results = []
+        seen = set()
+        for neo in matches:
+            if limit is not None and len(results) >= limit:
+                break
+            if id(neo) not in seen:
+                seen.add(id(neo))
+                results.append(neo)
+        return results
+
+    def query(self, filters=(), order_by=None, descending=False, limit=None, workers=None):
         """Query close approaches to generate those that match a collection of filters.
 
         This generates a stream of `CloseApproach` objects that match all of the
@@ -112,18 +944,438 @@ class NEODatabase:
 
         If no arguments are provided, generate all known close approaches.
 
-        The `CloseApproach` objects are generated in internal order, which isn't
-        guaranteed to be sorted meaninfully, although is often sorted by time.
+        Unless `order_by` is given, the `CloseApproach` objects are generated in
+        internal order, which isn't guaranteed to be sorted meaninfully, although
+        is often sorted by time. Otherwise, they are generated in order of the
+        given field, and approaches whose value of that field is unknown (such
+        as NEOs without a diameter) come last.
+
+        The positions of the matching approaches are cached under the normalized
+        form of the filters (see `filters.normalize_filters`), once a query has
+        been run to completion, so repeating an equivalent query only costs the
+        time to generate its results again.
+
+        Given several `workers`, a query that no index or bitmap can narrow is
+        instead scanned in parallel by that many worker processes (see
+        `sharded.ShardedExecutor`), and its results are generated in time order.
+        The worker processes are kept for later queries, until `close` is called.
 
         :param filters: A collection of filters capturing user-specified criteria.
+        :param order_by: One of 'time', 'distance', 'velocity' or 'diameter', or `None` for internal order.
+        :param descending: Whether to generate the largest values of `order_by` first.
+        :param limit: The maximum number of approaches to generate, or `None` for no limit.
+        :param workers: The number of worker processes with which to scan the approaches, or `None` for none.
         :return: A stream of matching `CloseApproach` objects.
+        :raises ValueError: If `order_by` isn't an indexed field.
         """
-        for approach in self._approaches:
-            # pair the approach with each filter
-            approach_filters = tuple(zip([approach] * len(filters), filters))
-            # perform logical and for all n conditions on the approach
-            # i.e conditions_met = condition1_met and condition2_met ..... and conditionn_met
-            conditions_met = reduce(lambda current_match, approach_filter: current_match and approach_filter[1](
-                approach_filter[0]), approach_filters, True)
-            if conditions_met:
-                yield approach
+        if order_by is None and workers and workers > 1 and self._columns is None:
+            rows = itertools.islice(self._sharded_rows(filters, workers), limit)
+        elif order_by is None:
+            rows = itertools.islice(self._rows(filters), limit)
+        elif order_by not in self._indexes:
+            raise ValueError(f"Unsupported sort field {order_by!r}.")
+        else:
+            rows = self._ordered_rows(filters, order_by, descending, limit)
+        return map(self._approaches.__getitem__, rows)
+
+    def count(self, filters=()):
+        """Count the close approaches that match a collection of filters.
+
+        If the filters can all be answered by a single index range, the count
+        is the width of that range, and no approach is touched.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: The number of matching approaches.
+        """
+        values = self._column_values('time', filters)
+        if values is not None:
+            return len(values)
+        plan = self._plan(filters)
+        if not plan.residual:
+            return len(plan) if plan.index is None or plan.bitmap is None else len(plan.rows)
+        return sum(1 for _ in self._rows(filters))
+
+    def min(self, field, filters=()):
+        """Find the smallest known value of a field among the matching close approaches.
+
+        :param field: One of 'time', 'distance', 'velocity' or 'diameter'.
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: The smallest value, or `None` if no matching approach has a known value.
+        """
+        return self._extreme(field, filters, largest=False)
+
+    def max(self, field, filters=()):
+        """Find the largest known value of a field among the matching close approaches.
+
+        :param field: One of 'time', 'distance', 'velocity' or 'diameter'.
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: The largest value, or `None` if no matching approach has a known value.
+        """
+        return self._extreme(field, filters, largest=True)
+
+    def mean(self, field, filters=()):
+        """Average the known values of a numeric field among the matching close approaches.
+
+        Approaches whose value is unknown (such as NEOs without a diameter) are
+        left out of the average.
+
+        :param field: One of 'distance', 'velocity' or 'diameter'.
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: The mean value, or `None` if no matching approach has a known value.
+        """
+        if field == 'time':
+            raise ValueError("The mean of approach times is not supported.")
+        values = self._column_values(field, filters)
+        if values is not None:
+            return float(values.mean()) if len(values) else None
+        total = count = 0
+        for value in self._field_values(field, filters):
+            total += value
+            count += 1
+        return total / count if count else None
+
+    def histogram(self, filters=(), by='year'):
+        """Count the matching close approaches in each calendar year or month.
+
+        Only buckets with at least one match are reported. If the filters only
+        constrain the approach time, each bucket's count is found with binary
+        searches on the time index, without touching any approach.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param by: Either 'year' or 'month'.
+        :return: A list of `(label, count)` tuples in chronological order, labelled like '2020' or '2020-03'.
+        :raises ValueError: If `by` is neither 'year' nor 'month'.
+        """
+        _bucket(datetime.datetime(2000, 1, 1), by)
+        if self._columns is not None:
+            counts = self._columns.histogram(filters, by)
+            if counts is not None:
+                return counts
+
+        plan = self._plan(filters)
+        if not plan.residual and plan.bitmap is None and plan.driver in (None, 'time'):
+            index = self._indexes['time']
+            position, stop = plan.span if plan.driver else (0, len(index))
+            counts = []
+            while position < stop:
+                label, boundary = _bucket(minutes_to_datetime(index.keys[position]), by)
+                following = bisect.bisect_left(index.keys, datetime_to_minutes(boundary), position, stop)
+                counts.append((label, following - position))
+                position = following
+            return counts
+
+        counts = collections.Counter(_bucket(time, by)[0] for time in self._field_values('time', filters))
+        return sorted(counts.items())
+
+    def _rows(self, filters):
+        """Generate the positions of the matching approaches, from the result cache if possible."""
+        key = normalize_filters(filters)
+        rows = self._cache.get(key)
+        if rows is None:
+            rows = self._matching_rows(filters, key)
+        return rows
+
+    def close(self):
+        """Shut down the worker processes of sharded queries, if any were started."""
+        with self._shards_lock:
+            if self._shards is not None:
+                self._shards.close()
+                self._shards = None
+
+    def _sharded_rows(self, filters, workers):
+        """Generate the positions of the matching approaches, scanning a full scan's shards in worker processes."""
+        plan = self._plan(filters, streaming=True)
+        if not filters or plan.driver is not None or len(plan) <= plan.total * _FULL_SCAN_FRACTION:
+            yield from self._rows(filters)
+            return
+        with self._shards_lock:
+            shards = self._shards
+            if shards is None or shards.workers != workers:
+                # Queries from other threads may still be scanning with the old executor, so it isn't
+                # closed here; it's released once the last of them lets go of it.
+                shards = self._shards = ShardedExecutor(self._approaches, self._indexes['time'].rows, workers)
+        candidates, residual = shards.rows(filters)
+        predicate = compile_filters(residual)
+        approaches = self._approaches
+        for row in candidates:
+            if predicate(approaches[row]):
+                yield row
+
+    def _ordered_rows(self, filters, order_by, descending, limit):
+        """Generate the positions of the matching approaches, in order of a field.
+
+        If no other field's index narrows the query much further, the sorted
+        index of `order_by` is walked from the appropriate end, checking the
+        remaining filters on each approach, so that the first results are found
+        without looking at the rest. Otherwise, the matching approaches are
+        found as usual, and the first `limit` of them in order are selected with
+        a heap that never holds more than `limit` positions.
+        """
+        plan = self._plan(filters)
+        walk = self._plan(filters, driver=order_by)
+        if plan.driver not in (None, order_by):
+            # Walking the index finds `limit` matches after about `limit / density` candidates.
+            density = max(plan.estimate, 1) / max(len(walk), 1)
+            if limit is None or limit / density >= len(plan):
+                yield from self._sorted_rows(filters, order_by, descending, limit)
+                return
+        yield from itertools.islice(self._walk_rows(walk, order_by, descending, filters), limit)
+
+    def _walk_rows(self, plan, order_by, descending, filters):
+        """Generate the positions of the approaches that match a plan driven by the `order_by` index."""
+        predicate = compile_filters(plan.residual)
+        approaches = self._approaches
+        bitmap = plan.bitmap
+        rows = plan.index.rows
+        start, stop = plan.span
+        for position in (range(stop - 1, start - 1, -1) if descending else range(start, stop)):
+            row = rows[position]
+            if (bitmap is None or row in bitmap) and predicate(approaches[row]):
+                yield row
+        # No filter on a field can match approaches whose value of that field is unknown.
+        if not any(approach_filter.field == order_by for approach_filter in filters):
+            for row in plan.index.unknown:
+                if (bitmap is None or row in bitmap) and predicate(approaches[row]):
+                    yield row
+
+    def _sorted_rows(self, filters, order_by, descending, limit):
+        """Sort the positions of the matching approaches by a field, keeping at most `limit` of them."""
+        get = _INDEX_KEYS[order_by]
+        approaches = self._approaches
+
+        def key(row):
+            value = get(approaches[row])
+            unknown = value != value
+            # Unknown values sort last in either direction.
+            return unknown != descending, 0 if unknown else value
+
+        rows = self._rows(filters)
+        if limit is None:
+            return sorted(rows, key=key, reverse=descending)
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(limit, rows, key=key)
+
+    def _field_values(self, field, filters):
+        """Generate the known values of an indexed field over the matching approaches."""
+        get = _INDEXED_FIELDS[field]
+        for row in self._rows(filters):
+            value = get(self._approaches[row])
+            if value == value:
+                yield value
+
+    def _column_values(self, field, filters):
+        """Select the known values of a field over the matching approaches with the columnar engine, if possible."""
+        if self._columns is None:
+            return None
+        return self._columns.values(field, filters)
+
+    def _extreme(self, field, filters, largest):
+        """Find the smallest or largest known value of a field among the matching approaches.
+
+        Unless another field's index narrows the query further, the field's own
+        sorted index is walked from the appropriate end, and the first
+        approach that passes the remaining filters holds the answer.
+        """
+        if field not in self._indexes:
+            raise ValueError(f"Unsupported field {field!r}.")
+        values = self._column_values(field, filters)
+        if values is not None:
+            if not len(values):
+                return None
+            value = values.max() if largest else values.min()
+            return minutes_to_datetime(int(value)) if field == 'time' else float(value)
+
+        plan = self._plan(filters)
+        if plan.driver not in (None, field):
+            values = self._field_values(field, filters)
+            return max(values, default=None) if largest else min(values, default=None)
+
+        index = self._indexes[field]
+        start, stop = plan.span if plan.driver else (0, len(index))
+        predicate = compile_filters(plan.residual)
+        bitmap = plan.bitmap
+        positions = range(stop - 1, start - 1, -1) if largest else range(start, stop)
+        for position in positions:
+            row = index.rows[position]
+            if (bitmap is None or row in bitmap) and predicate(self._approaches[row]):
+                key = index.keys[position]
+                return minutes_to_datetime(key) if field == 'time' else key
+        return None
+
+    def cache_info(self):
+        """Report the statistics of the query result cache.
+
+        :return: A `CacheInfo` of the number of hits and misses, and the current and maximum number of cached rows.
+        """
+        return CacheInfo(self._cache.hits, self._cache.misses, self._cache.rows, self._cache.max_rows)
+
+    def _matching_rows(self, filters, key):
+        """Generate the positions of the approaches that match a collection of filters.
+
+        Once every position has been generated, the positions are stored in the
+        result cache under `key`, unless there are more of them than the whole
+        cache holds; the positions stop being recorded as soon as that's clear,
+        so a broad query's memory doesn't grow with its number of matches.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param key: The normalized form of `filters`.
+        :return: A stream of approach positions, in internal order.
+        """
+        if self._columns is not None:
+            candidates, residual = self._columns.rows(filters)
+            candidates = candidates.tolist()
+        else:
+            plan = self._plan(filters, streaming=True)
+            candidates, residual = plan.rows, plan.residual
+        predicate = compile_filters(residual)
+        approaches = self._approaches
+        max_rows = self._cache.max_rows
+        matched = array.array('q')
+        for row in candidates:
+            if predicate(approaches[row]):
+                if matched is not None:
+                    matched.append(row)
+                    if len(matched) > max_rows:
+                        matched = None
+                yield row
+        if matched is not None:
+            self._cache.put(key, matched)
+
+    def explain(self, filters=()):
+        """Describe how a query would be executed, and how well the plan's estimate held up.
+
+        The query is run to count the actual number of matching approaches, so
+        this costs as much as consuming the results of `query`.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A human-readable description of the query plan, with estimated and actual row counts.
+        """
+        plan = self._plan(filters, streaming=True)
+        actual = sum(1 for _ in self.query(filters))
+        return f"{plan}\nActual matches: {actual}"
+
+    def _selectivity(self, approach_filter):
+        """Estimate the fraction of all approaches that pass a filter.
+
+        Filters on indexed fields are estimated exactly from the width of their
+        index range, and filters on low-cardinality fields from the counts of
+        each value gathered at load time.
+
+        :param approach_filter: A filter capturing a user-specified criterion.
+        :return: The estimated selectivity, between 0 and 1.
+        """
+        total = len(self._approaches)
+        interval = approach_filter.interval()
+        if not total or interval is None:
+            return _DEFAULT_SELECTIVITY
+        low, high = interval
+        if approach_filter.field in self._indexes:
+            start, stop = self._span(approach_filter)
+            return (stop - start) / total
+        if approach_filter.field in self._value_counts:
+            count = sum(n for value, n in self._value_counts[approach_filter.field].items()
+                        if value is not None
+                        and (low is None or value >= low) and (high is None or value <= high))
+            return count / total
+        return _DEFAULT_SELECTIVITY
+
+    def _bitmap(self, approach_filter):
+        """Build the bitmap of the approaches that pass a filter on a low-cardinality field.
+
+        :param approach_filter: A filter on a counted field, whose comparator is a closed interval.
+        :return: A `_Bitmap` of the matching approach positions.
+        """
+        low, high = approach_filter.interval()
+        matches = None
+        for value, bitmap in self._bitmaps[approach_filter.field].items():
+            if (low is None or value >= low) and (high is None or value <= high):
+                matches = bitmap if matches is None else matches | bitmap
+        return _Bitmap(len(self._approaches)) if matches is None else matches
+
+    def _span(self, approach_filter):
+        """Find the slice of its field's sorted index holding the approaches that pass a filter.
+
+        Date filters are resolved with the calendar index, by day ordinal, and
+        other filters with a binary search on the field's index - by whole
+        minutes, for other filters on the approach time.
+
+        :param approach_filter: A filter on an indexed field, whose comparator is a closed interval.
+        :return: A `(start, stop)` tuple of positions into the field's index.
+        """
+        if isinstance(approach_filter, DateFilter):
+            return self._calendar.span(*approach_filter.days())
+        interval = approach_filter.interval()
+        if approach_filter.field == 'time':
+            interval = minute_bounds(*interval)
+        return self._indexes[approach_filter.field].span(*interval)
+
+    def _plan(self, filters, driver=None, streaming=False):
+        """Choose a plan to execute a query with a collection of filters.
+
+        Each filter on an indexed field is resolved to a slice of the field's
+        sorted index (see `_span`), and the slices of filters on the same field
+        are intersected. The narrowest slice drives the query, unless `driver`
+        names the field whose index must drive it; the filters on every other
+        field are checked on each candidate approach, in order of increasing
+        estimated selectivity.
+
+        The candidates of an index range scan are visited in internal order,
+        which means sorting their positions before the first one is checked.
+        If `streaming` is set and the narrowest slice still covers most of the
+        table, a full scan is chosen instead, so that the first results of a
+        broad query are found without that delay.
+
+        Filters on low-cardinality fields are answered by intersecting the
+        bitmaps of their values, along with the bitmaps of known values of any
+        other filtered field. The bitmap rules out candidates without touching
+        their approaches, and drives the scan itself if it's expected to be
+        narrower than every index range.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param driver: The name of an indexed field whose index must drive the scan, or `None` to choose one.
+        :param streaming: Whether the candidates will be visited lazily, in internal order.
+        :return: A `QueryPlan` for the query.
+        """
+        spans = dict()
+        for approach_filter in filters:
+            if approach_filter.field not in self._indexes or approach_filter.interval() is None:
+                continue
+            start, stop = self._span(approach_filter)
+            low, high = spans.get(approach_filter.field, (0, len(self._indexes[approach_filter.field])))
+            start, stop = max(start, low), min(stop, high)
+            spans[approach_filter.field] = (start, max(start, stop))
+
+        bitmap = None
+        bitmapped = []
+        for approach_filter in filters:
+            if approach_filter.field in self._bitmaps and approach_filter.interval() is not None:
+                matches = self._bitmap(approach_filter)
+                bitmap = matches if bitmap is None else bitmap & matches
+                bitmapped.append((approach_filter, self._selectivity(approach_filter)))
+
+        total = len(self._approaches)
+        span = (0, total)
+        if driver is not None:
+            span = spans.get(driver, (0, len(self._indexes[driver])))
+        elif spans:
+            driver = min(spans, key=lambda field: spans[field][1] - spans[field][0])
+            span = spans[driver]
+            width = span[1] - span[0]
+            estimate = total
+            for _, selectivity in bitmapped:
+                estimate *= selectivity
+            if (bitmap is not None and estimate < width) or (streaming and width > total * _FULL_SCAN_FRACTION):
+                driver, span = None, (0, total)
+
+        # No filter on a field matches the approaches whose value of that field is unknown.
+        known = tuple(field for field in spans if field != driver and field in self._known)
+        for field in known:
+            bitmap = self._known[field] if bitmap is None else bitmap & self._known[field]
+
+        residual = [approach_filter for approach_filter in filters
+                    if approach_filter.interval() is None
+                    or (approach_filter.field not in self._bitmaps and approach_filter.field != driver)]
+        residual.sort(key=self._selectivity)
+        selectivities = [self._selectivity(approach_filter) for approach_filter in residual]
+        return QueryPlan(driver, self._indexes.get(driver), span, tuple(residual), selectivities, total,
+                         bitmap, tuple(bitmapped), known)
@@ -2,52 +2,488 @@
 
 The `load_neos` function extracts NEO data from a CSV file, formatted as
 described in the project instructions, into a collection of `NearEarthObject`s.
+It only extracts the columns it needs, plus any extra columns requested.
 
 The `load_approaches` function extracts close approach data from a JSON file,
 formatted as described in the project instructions, into a collection of
-`CloseApproach` objects.
+`CloseApproach` objects. The file is read incrementally: `iter_approaches`
+decodes the entries of its `data` array one at a time, so the raw JSON text and
+the decoded list of entries are never held in memory all at once. The position
+of each field in the entries is looked up by name in the document's `fields`
+member, and additional numeric fields can be collected into compact arrays.
+
+Given several `jobs`, `load_approaches` instead splits the `data` array into
+chunks of whole entries, and parses them in a pool of worker processes. Each
+worker sends back its chunk as a few compact columnar buffers - the packed
+designations, times, distances and velocities - rather than as pickled objects,
+and the `CloseApproach` objects are rebuilt from those buffers in order.
 
 The main module calls these functions with the arguments provided at the command
 line, and uses the resulting collections to build an `NEODatabase`.
 
 You'll edit this file in Task 2.
 """
+import array
+import concurrent.futures
 import csv
+import itertools
 import json
+import math
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures.process import BrokenProcessPool
 
+from helpers import cd_to_datetime, datetime_to_minutes
 from models import NearEarthObject, CloseApproach
 
 
-def load_neos(neo_csv_path='data/neos.csv'):
+# The start method of the worker processes that parse chunks of a close approach
+# data file. The caller may be running other threads (`main.load_database` parses
+# the NEO file in one), and forking a multi-threaded process can deadlock, so the
+# workers are forked from a single-threaded fork server where there is one.
+_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None)
+
+# The columns of the NEO CSV file that every `NearEarthObject` needs.
+_NEO_COLUMNS = ('pdes', 'name', 'diameter', 'pha')
+
+
+def _parse_extra(value):
+    """Convert the text of an extra CSV column into a number if possible, or `None` if empty."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _iter_csv_rows(lines):
+    """Generate the fields of each row of CSV text, splitting on commas while no quotes appear.
+
+    Once a line contains a quote, the rest of the text is read with
+    `csv.reader`, which understands quoted commas and newlines.
+    """
+    for line in lines:
+        if '"' in line:
+            yield from csv.reader(itertools.chain((line,), lines))
+            return
+        yield line.rstrip('\r\n').split(',')
+
+
+def load_neos(neo_csv_path='data/neos.csv', extra_columns=()):
     """Read near-Earth object information from a CSV file.
 
+    Only the needed columns are extracted: their positions are looked up once
+    in the header, and each row is split into a list of fields, without
+    building a dictionary per row.
+
     :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param extra_columns: The names of additional columns (such as 'H', 'albedo' or 'moid') to keep in each NEO's `extras`.
     :return: A collection of `NearEarthObject`s.
+    :raises ValueError: If the file lacks a required or requested column.
     """
     neo_collection = []
-    with open(neo_csv_path, 'r') as neo_file:
-        reader = csv.DictReader(neo_file)
-        for row in reader:
-            pha = row['pha'].upper() == 'Y'
-            neo = NearEarthObject(
-                row['pdes'], row['name'], row['diameter'], pha)
+    with open(neo_csv_path, 'r', newline='') as neo_file:
+        rows = _iter_csv_rows(neo_file)
+        header = next(rows, [])
+        missing = [column for column in (*_NEO_COLUMNS, *extra_columns) if column not in header]
+        if missing:
+            raise ValueError(f"{neo_csv_path} has no column(s) {', '.join(missing)}.")
+        pdes, name, diameter, pha = (header.index(column) for column in _NEO_COLUMNS)
+        extras = [(column, header.index(column)) for column in extra_columns]
+        width = max(pdes, name, diameter, pha, *(position for _, position in extras)) + 1
+
+        for row in rows:
+            if len(row) < width:
+                if not any(row):
+                    continue
+                row += [''] * (width - len(row))
+            neo = NearEarthObject(row[pdes], row[name], row[diameter], row[pha].upper() == 'Y',
+                                  extras={column: _parse_extra(row[position]) for column, position in extras}
+                                  if extras else None)
             neo_collection.append(neo)
     return tuple(neo_collection)
 
 
-def load_approaches(cad_json_path='data/cad.json'):
+# Whitespace allowed between JSON tokens.
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# The number of characters to read from a JSON file at a time.
+_CHUNK_SIZE = 1 << 16
+
+
+class _JSONStream:
+    """An incremental reader of JSON tokens and values from a text file.
+
+    The reader keeps a small buffer of the file's text, reading more as needed,
+    and decodes one value at a time with `json.JSONDecoder.raw_decode`. It only
+    understands enough of the JSON grammar to walk the structure of a document
+    whose parts are decoded whole.
+    """
+
+    def __init__(self, file, chunk_size=_CHUNK_SIZE):
+        """Create a new `_JSONStream` over an open text file.
+
+        :param file: A file-like object open for reading text.
+        :param chunk_size: The number of characters to read from the file at a time.
+        """
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Read another chunk from the file, dropping the consumed part of the buffer.
+
+        :return: Whether any more text was read.
+        """
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _error(self, message):
+        """Build a `JSONDecodeError` at the current position of the buffer."""
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def peek(self):
+        """Skip whitespace and return the next character, without consuming it.
+
+        :return: The next non-whitespace character, or the empty string at the end of the file.
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        """Skip whitespace and consume the next character, which must be `char`.
+
+        :raises json.JSONDecodeError: If the next character isn't `char`.
+        """
+        if self.peek() != char:
+            raise self._error(f"Expecting {char!r}")
+        self._pos += 1
+
+    def value(self):
+        """Skip whitespace and decode the next complete JSON value.
+
+        :return: The decoded value.
+        :raises json.JSONDecodeError: If the next value isn't valid JSON.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number that ends with the buffer might continue in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_cad_data(cad_file, header=None, chunk_size=_CHUNK_SIZE):
+    """Generate the entries of the `data` array of a close approach JSON document.
+
+    The other members of the top-level object (such as `count` and `fields`)
+    are decoded whole and, if `header` is given, stored into it as they're
+    encountered.
+
+    :param cad_file: A file-like object open for reading the JSON document.
+    :param header: A dictionary in which to store the other top-level members.
+    :param chunk_size: The number of characters to read from the file at a time.
+    :return: A stream of the entries of the `data` array, each a list of values.
+    :raises json.JSONDecodeError: If the file isn't a JSON object.
+    """
+    stream = _JSONStream(cad_file, chunk_size)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if key == 'data':
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.expect(']')
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() != ',':
+                        stream.expect(']')
+                        break
+                    stream.expect(',')
+        else:
+            member = stream.value()
+            if header is not None:
+                header[key] = member
+        if stream.peek() != ',':
+            stream.expect('}')
+            return
+        stream.expect(',')
+
+
+# The fields of each entry of the `data` array, in the order of NASA's API, for
+# documents that don't list their `fields`.
+_CAD_FIELDS = ('des', 'orbit_id', 'jd', 'cd', 'dist', 'dist_min', 'dist_max', 'v_rel', 'v_inf', 't_sigma_f', 'h')
+
+# The fields every `CloseApproach` needs.
+_APPROACH_FIELDS = ('des', 'cd', 'dist', 'v_rel')
+
+# The `fields` and `count` members of a close approach JSON document.
+_FIELDS_MEMBER = re.compile(rb'"fields"\s*:\s*(\[[^\]]*\])')
+_COUNT_MEMBER = re.compile(rb'"count"\s*:\s*"?(\d+)"?')
+
+
+def _read_cad_schema(cad_json_path):
+    """Find the `fields` and `count` of a close approach JSON document, without parsing its data.
+
+    The members are found with a regular expression over a memory map of the
+    file, wherever they are. Since this could in principle be fooled by the
+    text of an entry, the members decoded while parsing the whole document are
+    checked against these later.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: A tuple of the list of field names (or `_CAD_FIELDS` if not given) and the count (or `None`).
+    """
+    fields, count = list(_CAD_FIELDS), None
+    with open(cad_json_path, 'rb') as cad_file:
+        if not cad_file.seek(0, 2):
+            return fields, count
+        with mmap.mmap(cad_file.fileno(), 0, access=mmap.ACCESS_READ) as document:
+            match = _FIELDS_MEMBER.search(document)
+            if match is not None:
+                fields = json.loads(match.group(1))
+            match = _COUNT_MEMBER.search(document)
+            if match is not None:
+                count = int(match.group(1))
+    return fields, count
+
+
+def _field_positions(cad_json_path, fields, names):
+    """Find the position of each named field in the entries of the `data` array.
+
+    :raises ValueError: If a field isn't present.
+    """
+    missing = [name for name in names if name not in fields]
+    if missing:
+        raise ValueError(f"{cad_json_path} has no field(s) {', '.join(missing)}.")
+    return tuple(fields.index(name) for name in names)
+
+
+def _to_float(value):
+    """Convert the text of an extra numeric field into a float, or NaN if it's missing or not a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _check_header(cad_json_path, header, fields, count, loaded):
+    """Check that the members decoded from a whole document agree with its schema, as read up front.
+
+    :raises ValueError: If the fields differ, or the document doesn't hold `count` entries.
+    """
+    if header.get('fields', fields) != fields:
+        raise ValueError(f"{cad_json_path} lists its fields more than once.")
+    if count is not None and loaded != count:
+        raise ValueError(f"{cad_json_path} declares {count} close approaches, but holds {loaded}.")
+
+
+def iter_approaches(cad_json_path='data/cad.json', compact_time=False, extras=None):
+    """Generate close approaches from a JSON file, one entry at a time.
+
+    The position of each field in the entries is resolved once, from the
+    document's `fields` member. If `extras` is given, its keys name additional
+    numeric fields (such as 'dist_min', 'dist_max', 'v_inf' or 'h'), and the
+    value of each of those fields for every approach is appended, as a float,
+    to an `array('d')` stored under that key; missing values are NaN.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param compact_time: Whether each `CloseApproach` stores its time as an integer count of minutes.
+    :param extras: A dictionary whose keys name additional fields to collect into arrays.
+    :return: A stream of `CloseApproach`es.
+    :raises ValueError: If a field is missing, or the document doesn't hold as many entries as its `count`.
+    """
+    fields, count = _read_cad_schema(cad_json_path)
+    des, cd, dist, v_rel = _field_positions(cad_json_path, fields, _APPROACH_FIELDS)
+    columns = []
+    if extras is not None:
+        for name, position in zip(extras, _field_positions(cad_json_path, fields, tuple(extras))):
+            extras[name] = array.array('d')
+            columns.append((extras[name].append, position))
+
+    header = {}
+    loaded = 0
+    with open(cad_json_path, 'r') as cad_file:
+        for entry in _iter_cad_data(cad_file, header):
+            for append, position in columns:
+                append(_to_float(entry[position]))
+            loaded += 1
+            yield CloseApproach(entry[des], entry[cd], entry[dist], entry[v_rel], compact_time=compact_time)
+    _check_header(cad_json_path, header, fields, count, loaded)
+
+
+# The start of the `data` array of a close approach JSON document.
+_DATA_START = re.compile(rb'"data"\s*:\s*\[')
+
+# The separator between two entries of the `data` array.
+_ENTRY_BOUNDARY = re.compile(rb'\]\s*,\s*\[')
+
+# The smallest number of bytes of the `data` array worth parsing in a worker process.
+# Starting the pool costs about as much as parsing a few megabytes serially.
+_MIN_CHUNK_BYTES = 8 << 20
+
+
+def _parse_cad_chunk(cad_json_path, start, stop, positions, extra_positions=()):
+    """Parse a chunk of whole entries of the `data` array into columnar buffers.
+
+    This runs in a worker process. The chunk is the byte range `[start, stop)`
+    of the file, holding comma-separated entries; if `stop` is `None`, the
+    chunk runs to the end of the `data` array.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param start: The offset of the first entry of the chunk.
+    :param stop: The offset just past the last entry of the chunk, or `None`.
+    :param positions: The positions of the designation, date, distance and velocity in each entry.
+    :param extra_positions: The positions of additional numeric fields to collect.
+    :return: A tuple of the packed designations, times in minutes, distances and velocities, and a list of the additional fields, as bytes.
+    """
+    with open(cad_json_path, 'rb') as cad_file:
+        cad_file.seek(start)
+        text = cad_file.read(-1 if stop is None else stop - start).decode('utf-8')
+    if stop is None:
+        entries, _ = json.JSONDecoder().raw_decode('[' + text)
+    else:
+        entries = json.loads('[' + text + ']')
+    des, cd, dist, v_rel = positions
+    return ('\n'.join(entry[des] for entry in entries).encode('utf-8'),
+            array.array('q', (datetime_to_minutes(cd_to_datetime(entry[cd])) for entry in entries)).tobytes(),
+            array.array('d', (float(entry[dist]) for entry in entries)).tobytes(),
+            array.array('d', (float(entry[v_rel]) for entry in entries)).tobytes(),
+            [array.array('d', (_to_float(entry[position]) for entry in entries)).tobytes()
+             for position in extra_positions])
+
+
+def _split_cad_data(cad_json_path, chunks):
+    """Find the byte ranges of about `chunks` chunks of whole entries of the `data` array.
+
+    :return: A list of `(start, stop)` offsets, the last with `stop=None`, or `None` if there is no `data` array.
+    """
+    with open(cad_json_path, 'rb') as cad_file, \
+            mmap.mmap(cad_file.fileno(), 0, access=mmap.ACCESS_READ) as document:
+        match = _DATA_START.search(document)
+        if match is None:
+            return None
+        start = match.end()
+        size = len(document) - start
+        ranges = []
+        for chunk in range(1, chunks):
+            boundary = _ENTRY_BOUNDARY.search(document, max(start, match.end() + size * chunk // chunks))
+            if boundary is None:
+                break
+            ranges.append((start, boundary.start() + 1))
+            start = boundary.end() - 1
+        ranges.append((start, None))
+        return ranges
+
+
+def _load_approaches_parallel(cad_json_path, compact_time, jobs, min_chunk_bytes=None, extras=None):
+    """Read close approach data from a JSON file, parsing chunks of it in worker processes.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param compact_time: Whether each `CloseApproach` stores its time as an integer count of minutes.
+    :param jobs: The maximum number of worker processes.
+    :param min_chunk_bytes: The smallest chunk worth sending to a worker process, if not `_MIN_CHUNK_BYTES`.
+    :param extras: A dictionary whose keys name additional fields to collect into arrays, as for `iter_approaches`.
+    :return: A collection of `CloseApproach`es, or `None` if the file can't be split into chunks.
+    """
+    with open(cad_json_path, 'rb') as cad_file:
+        size = cad_file.seek(0, 2)
+    chunks = min(jobs, size // max(min_chunk_bytes or _MIN_CHUNK_BYTES, 1))
+    if chunks < 2:
+        return None
+    ranges = _split_cad_data(cad_json_path, chunks)
+    if ranges is None:
+        return None
+    fields, count = _read_cad_schema(cad_json_path)
+    positions = _field_positions(cad_json_path, fields, _APPROACH_FIELDS)
+    names = tuple(extras or ())
+    extra_positions = _field_positions(cad_json_path, fields, names)
+
+    approaches = [] if count is None else [None] * count
+    columns = [array.array('d') for _ in names]
+    loaded = 0
+    with concurrent.futures.ProcessPoolExecutor(len(ranges), mp_context=_MP_CONTEXT) as executor:
+        futures = [executor.submit(_parse_cad_chunk, cad_json_path, start, stop, positions, extra_positions)
+                   for start, stop in ranges]
+        for future in futures:
+            designations, times, distances, velocities, extra_columns = future.result()
+            times = array.array('q', times)
+            designations = designations.decode('utf-8').split('\n') if times else []
+            if count is not None and loaded + len(times) > count:
+                raise ValueError(f"{cad_json_path} holds more than the {count} close approaches it declares.")
+            approaches[loaded:loaded + len(times)] = (
+                CloseApproach(designation, minutes, distance, velocity, compact_time=compact_time)
+                for designation, minutes, distance, velocity
+                in zip(designations, times, array.array('d', distances), array.array('d', velocities))
+            )
+            loaded += len(times)
+            for column, values in zip(columns, extra_columns):
+                column.frombytes(values)
+    _check_header(cad_json_path, {}, fields, count, loaded)
+    if extras is not None:
+        extras.update(zip(names, columns))
+    return tuple(approaches)
+
+
+def available_cpus():
+    """Return the number of CPUs on which this process may run."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - depends on the platform.
+        return os.cpu_count() or 1
+
+
+def load_approaches(cad_json_path='data/cad.json', compact_time=False, jobs=1, extras=None):
     """Read close approach data from a JSON file.
 
-    :param neo_csv_path: A path to a JSON file containing data about close approaches.
+    With more than one job, a large file is parsed in chunks by a pool of
+    worker processes, at most one per available CPU. If the file can't be
+    split that way, a chunk turns out to be malformed, or the worker processes
+    can't be started (for example, from a script that's imported by the
+    workers without an `if __name__ == '__main__'` guard), it's read serially
+    instead.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param compact_time: Whether each `CloseApproach` stores its time as an integer count of minutes.
+    :param jobs: The maximum number of worker processes with which to parse the file.
+    :param extras: A dictionary whose keys name additional numeric fields to collect into arrays, as for `iter_approaches`.
     :return: A collection of `CloseApproach`es.
+    :raises ValueError: If a field is missing, or the document doesn't hold as many entries as its `count`.
     """
-    neo_approaches = []
-    with open(cad_json_path, 'r') as cad_file:
-        file_contents = cad_file.read()
-        file_contents = json.loads(file_contents)
-        cad_data = file_contents['data']
-        for entry in cad_data:
-            cad = CloseApproach(entry[0], entry[3], entry[4], entry[7])
-            neo_approaches.append(cad)
-
-    return tuple(neo_approaches)
+    jobs = min(jobs, available_cpus())
+    if jobs > 1:
+        try:
+            approaches = _load_approaches_parallel(cad_json_path, compact_time, jobs, extras=extras)
+        except (OSError, ValueError, IndexError, TypeError, RuntimeError, BrokenProcessPool):
+            approaches = None
+        if approaches is not None:
+            return approaches
+    return tuple(iter_approaches(cad_json_path, compact_time, extras))
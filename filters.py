@@ -11,11 +11,21 @@ from a comparator (from the `operator` module), a reference value, and a class
 method `get` that subclasses can override to fetch an attribute of interest from
 the supplied `CloseApproach`.
 
+The `compile_filters` function fuses a collection of filters into a single
+predicate, merging the bounds of filters on the same attribute, so that checking
+an approach against many filters costs as little as possible.
+
+Filters compare and hash by value, and `normalize_filters` turns a collection of
+them into a canonical, hashable form, so that equivalent queries can share cached
+results.
+
 The `limit` function simply limits the maximum number of values produced by an
 iterator.
 
 You'll edit this file in Tasks 3a and 3c.
 """
+import datetime
+import itertools
 import operator
 
 
@@ -36,8 +46,10 @@ class AttributeFilter:
     infix notation).
 
     Concrete subclasses can override the `get` classmethod to provide custom
-    behavior to fetch a desired attribute from the given `CloseApproach`.
+    behavior to fetch a desired attribute from the given `CloseApproach`, and
+    set `field` to the name of the indexed attribute that `interval` describes.
     """
+    field = None
 
     def __init__(self, op, value):
         """Construct a new `AttributeFilter` from an binary predicate and a reference value.
@@ -69,6 +81,34 @@ class AttributeFilter:
         """
         raise UnsupportedCriterionError
 
+    def interval(self):
+        """Return the closed interval of `field` values accepted by this filter.
+
+        The interval is a `(low, high)` tuple, where either bound may be `None`
+        to indicate that it is unbounded. This lets the `NEODatabase` answer
+        the filter with a range lookup on a sorted index instead of calling the
+        filter on every approach.
+
+        :return: A `(low, high)` tuple, or `None` if the comparator can't be expressed as a closed interval.
+        """
+        if self.op is operator.eq:
+            return self.value, self.value
+        if self.op is operator.ge:
+            return self.value, None
+        if self.op is operator.le:
+            return None, self.value
+        return None
+
+    def __eq__(self, other):
+        """Return whether `other` is a filter of the same kind with the same comparator and value."""
+        if not isinstance(other, AttributeFilter):
+            return NotImplemented
+        return type(self) is type(other) and self.op is other.op and self.value == other.value
+
+    def __hash__(self):
+        """Return a hash consistent with `__eq__`."""
+        return hash((type(self), self.op, self.value))
+
     def __repr__(self):
         return f"{self.__class__.__name__}(op=operator.{self.op.__name__}, value={self.value})"
 
@@ -78,6 +118,7 @@ class DiameterFilter(AttributeFilter):
 
     This class overrides the get method of abstract class.
     """
+    field = 'diameter'
 
     @classmethod
     def get(cls, approach):
@@ -89,6 +130,7 @@ class HazardFilter(AttributeFilter):
 
     This class overrides the get method of abstract class.
     """
+    field = 'hazardous'
 
     @classmethod
     def get(cls, approach):
@@ -98,19 +140,48 @@ class HazardFilter(AttributeFilter):
 class DateFilter(AttributeFilter):
     """Implementation of Attribute filter for CloseApproach time property.
 
-    This class overrides the get method of abstract class.
+    This class overrides the get method of abstract class. Its interval is
+    expressed in terms of the approach `time`, so that a date bound covers
+    every minute of that day.
     """
+    field = 'time'
 
     @classmethod
     def get(cls, approach):
         return approach.time.date()
 
+    def interval(self):
+        bounds = super().interval()
+        if bounds is None:
+            return None
+        low, high = bounds
+        if low is not None:
+            low = datetime.datetime.combine(low, datetime.time.min)
+        if high is not None:
+            high = datetime.datetime.combine(high, datetime.time.max)
+        return low, high
+
+    def days(self):
+        """Return the closed interval of day ordinals accepted by this filter.
+
+        This is the same interval as `interval`, in terms of `date.toordinal()`
+        rather than approach times, so that the `NEODatabase` can look up the
+        approaches on those days in its calendar index.
+
+        :return: A `(low, high)` tuple of ordinals or `None`s, or `None` if the comparator isn't an interval.
+        """
+        bounds = super().interval()
+        if bounds is None:
+            return None
+        return tuple(None if bound is None else bound.toordinal() for bound in bounds)
+
 
 class DistanceFilter(AttributeFilter):
     """Implementation of Attribute filter for CloseApproach distance property.
 
     This class overrides the get method of abstract class.
     """
+    field = 'distance'
 
     @classmethod
     def get(cls, approach):
@@ -122,6 +193,7 @@ class VelocityFilter(AttributeFilter):
 
     This class overrides the get method of abstract class.
     """
+    field = 'velocity'
 
     @classmethod
     def get(cls, approach):
@@ -187,30 +259,105 @@ def create_filters(date=None, start_date=None, end_date=None,
     return tuple(filters)
 
 
+def normalize_filters(filters):
+    """Build a canonical, hashable description of a collection of filters.
+
+    Since a query matches the approaches that pass all of its filters, neither
+    the order of the filters nor any repetition affects the result. Two
+    collections of filters select the same approaches if their normalized forms
+    are equal.
+
+    :param filters: A collection of filters, such as the result of `create_filters`.
+    :return: A `frozenset` of the filters, which can itself be passed to `query`.
+    """
+    return frozenset(filters)
+
+
+# Functions that fetch the value of each filterable field from a `CloseApproach`.
+_FIELD_GETTERS = {
+    'time': operator.attrgetter('time'),
+    'distance': operator.attrgetter('distance'),
+    'velocity': operator.attrgetter('velocity'),
+    'diameter': operator.attrgetter('neo.diameter'),
+    'hazardous': operator.attrgetter('neo.hazardous'),
+}
+
+
+def _range_check(get, low, high):
+    """Build a predicate testing whether a fetched value lies in the closed interval `[low, high]`."""
+    if low is None and high is None:
+        return None
+    if low is None:
+        return lambda approach: get(approach) <= high
+    if high is None:
+        return lambda approach: get(approach) >= low
+    if low == high:
+        return lambda approach: get(approach) == low
+    return lambda approach: low <= get(approach) <= high
+
+
+def _both(first, second):
+    """Build a short-circuiting conjunction of two predicates."""
+    return lambda approach: first(approach) and second(approach)
+
+
+def compile_filters(filters):
+    """Fuse a collection of filters into a single predicate on a `CloseApproach`.
+
+    Filters that can be expressed as an interval on a known field are grouped
+    by field and their bounds merged, so that `--min-distance` and
+    `--max-distance` become a single chained comparison. Date bounds are tested
+    against the approach time directly, without building a `date` per approach.
+    Any other filter is called as-is. The checks are chained in the order their
+    fields first appear in `filters`, and evaluation stops at the first failure.
+
+    The resulting predicate is equivalent to calling every filter on the
+    approach and requiring all of them to pass.
+
+    :param filters: A collection of filters, such as the result of `create_filters`.
+    :return: A 1-argument predicate on a `CloseApproach`.
+    """
+    bounds = {}
+    checks = []
+    for approach_filter in filters:
+        interval = approach_filter.interval()
+        if interval is None or approach_filter.field not in _FIELD_GETTERS:
+            checks.append(approach_filter)
+            continue
+        if approach_filter.field not in bounds:
+            checks.append(approach_filter.field)
+        low, high = bounds.get(approach_filter.field, (None, None))
+        new_low, new_high = interval
+        if new_low is not None and (low is None or new_low > low):
+            low = new_low
+        if new_high is not None and (high is None or new_high < high):
+            high = new_high
+        if low is not None and high is not None and low > high:
+            return lambda approach: False
+        bounds[approach_filter.field] = (low, high)
+
+    predicate = None
+    for check in checks:
+        if check in bounds:
+            check = _range_check(_FIELD_GETTERS[check], *bounds[check])
+            if check is None:
+                continue
+        predicate = check if predicate is None else _both(predicate, check)
+    if predicate is None:
+        return lambda approach: True
+    return predicate
+
+
 def limit(iterator, n=None):
     """Produce a limited stream of values from an iterator.
 
     If `n` is 0 or None, don't limit the iterator at all.
 
+    The values are produced lazily, so no more than `n` values are ever drawn
+    from the iterator, and each one is available as soon as it's drawn.
+
     :param iterator: An iterator of values.
     :param n: The maximum number of values to produce.
     :yield: The first (at most) `n` values from the iterator.
     """
-    if not n:
-        return iterator
-    x = get_with_limits(iterator)
-    i = 0
-    result = []
-    while i < n:
-        try:
-            result.append(next(x))
-            i += 1
-        except StopIteration:
-            return result
-    return result
-
-
-def get_with_limits(iterable):
-    for i in iterable:
-        yield i
-    return
+    return itertools.islice(iterator, n or None)
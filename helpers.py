@@ -3,14 +3,66 @@
 NASA's dataset provides timestamps as naive datetimes (corresponding to UTC).
 
 The `cd_to_datetime` function converts a string, formatted as the `cd` field of
-NASA's close approach data, into a Python `datetime`
+NASA's close approach data, into a Python `datetime`. Since it's called once per
+close approach, it parses the fixed layout of that field by hand, and only falls
+back to `datetime.strptime` for input that doesn't fit the layout exactly.
 
 The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
 representations display seconds, but NASA's data (and our datetimes!) don't
 provide that level of resolution, so the output format also will not.
+
+The `datetime_to_minutes` and `minutes_to_datetime` functions convert between a
+naive `datetime` and a compact integer count of minutes since the Unix epoch,
+which is how columnar and serialized representations store approach times, and
+`minute_bounds` converts a closed interval of datetimes into whole minutes.
 """
 import datetime
+import functools
+
+
+# The reference point for integer minute counts.
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MINUTE = datetime.timedelta(minutes=1)
+
+# The English locale's abbreviated month names, as used by NASA's `cd` field.
+_MONTHS = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+           'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _cd_date(date_part):
+    """Split the `YYYY-bb-DD` part of a calendar date into year, month and day numbers.
+
+    Many close approaches share a date, so the results are memoized.
+
+    :param date_part: The first 11 characters of a calendar date.
+    :return: A `(year, month, day)` tuple of integers.
+    :raises ValueError: If the date doesn't fit the `YYYY-bb-DD` layout.
+    :raises KeyError: If the month isn't a known abbreviation.
+    """
+    year, day = date_part[:4], date_part[9:]
+    if not (year.isdigit() and day.isdigit()):
+        raise ValueError(date_part)
+    return int(year), _MONTHS[date_part[5:8]], int(day)
+
+
+def _fast_cd_to_datetime(calendar_date):
+    """Parse a calendar date in the exact `YYYY-bb-DD hh:mm` layout, by slicing.
+
+    :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :return: A naive `datetime` corresponding to the given calendar date and time.
+    :raises ValueError: If the input doesn't fit the layout or isn't a valid date.
+    :raises KeyError: If the month isn't a known abbreviation.
+    """
+    if (len(calendar_date) != 17 or calendar_date[4] != '-' or calendar_date[8] != '-'
+            or calendar_date[11] != ' ' or calendar_date[14] != ':'):
+        raise ValueError(calendar_date)
+    hour, minute = calendar_date[12:14], calendar_date[15:]
+    if not (hour.isdigit() and minute.isdigit()):
+        raise ValueError(calendar_date)
+    year, month, day = _cd_date(calendar_date[:11])
+    return datetime.datetime(year, month, day, int(hour), int(minute))
 
 
 def cd_to_datetime(calendar_date):
@@ -26,7 +78,11 @@ def cd_to_datetime(calendar_date):
     :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
     :return: A naive `datetime` corresponding to the given calendar date and time.
     """
-    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+    try:
+        return _fast_cd_to_datetime(calendar_date)
+    except (TypeError, ValueError, KeyError):
+        # Let `strptime` accept the looser inputs it allows, or raise its usual error.
+        return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
 
 
 def datetime_to_str(dt):
@@ -42,3 +98,40 @@ def datetime_to_str(dt):
     :return: That datetime, as a human-readable string without seconds.
     """
     return datetime.datetime.strftime(dt, "%Y-%m-%d %H:%M")
+
+
+def datetime_to_minutes(dt):
+    """Convert a naive Python datetime into whole minutes since the Unix epoch.
+
+    Seconds and microseconds are truncated, rounding towards the past.
+
+    :param dt: A naive Python datetime.
+    :return: The number of minutes from 1970-01-01 00:00 to `dt`, as an integer.
+    """
+    return (dt - _EPOCH) // _MINUTE
+
+
+def minutes_to_datetime(minutes):
+    """Convert a count of minutes since the Unix epoch into a naive Python datetime.
+
+    :param minutes: The number of minutes from 1970-01-01 00:00, as an integer.
+    :return: The corresponding naive `datetime`.
+    """
+    return _EPOCH + datetime.timedelta(minutes=minutes)
+
+
+def minute_bounds(low, high):
+    """Convert a closed interval of datetimes into the closed interval of whole minutes it contains.
+
+    :param low: The earliest `datetime` in the interval, or `None` if unbounded.
+    :param high: The latest `datetime` in the interval, or `None` if unbounded.
+    :return: A `(low, high)` tuple of minute counts since the Unix epoch, either of which may be `None`.
+    """
+    if low is not None:
+        minutes = datetime_to_minutes(low)
+        if low.second or low.microsecond:
+            minutes += 1
+        low = minutes
+    if high is not None:
+        high = datetime_to_minutes(high)
+    return low, high
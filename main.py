@@ -5,7 +5,7 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,stats,interactive,serve} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
@@ -14,6 +14,17 @@ optionally lists all of that NEO's known close approaches:
     $ python3 main.py inspect --name Halley
     $ python3 main.py inspect --verbose --name Halley
 
+A summary of the NEO's known close approaches - their number, and the first,
+last, closest and fastest of them - and the next approach on or after a date
+(by default, today) can be printed too:
+
+    $ python3 main.py inspect --summary --name Halley
+    $ python3 main.py inspect --next 2020-06-01 --pdes 433
+
+NEOs can also be found by a partial or misspelled name, ignoring case:
+
+    $ python3 main.py inspect --search apoph
+
 The `query` subcommand searches for close approaches that match given criteria:
 
     $ python3 main.py query --date 1969-07-29
@@ -29,24 +40,76 @@ or JSON format:
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
 
+The results can be ordered by time, distance, velocity or diameter instead, with
+the largest values first if requested. Only the requested number of results is
+kept while searching, so this is cheap for a small limit:
+
+    $ python3 main.py query --sort distance --limit 20
+    $ python3 main.py query --start-date 2020-01-01 --sort velocity --desc --limit 5
+
+A broad query that the indexes can't narrow much can instead be scanned in
+parallel by several worker processes:
+
+    $ python3 main.py query --min-velocity 5 --not-hazardous --workers 8 --outfile results.csv
+
+The plan chosen for a query, with its estimated and actual number of matches,
+can be shown instead of the results:
+
+    $ python3 main.py query --explain --date 2020-03-14 --hazardous
+
+The `stats` subcommand accepts the same filters as `query`, and summarizes the
+matching close approaches instead of listing them - their count, dates, and the
+range and mean of their distances, velocities and diameters - optionally with
+the number of matches in each calendar year or month:
+
+    $ python3 main.py stats --hazardous --max-distance 0.05
+    $ python3 main.py stats --start-date 2020-01-01 --end-date 2020-12-31 --by month
+
 The `interactive` subcommand loads the NEO database and spawns an interactive
 command shell that can repeatedly execute `inspect` and `query` commands without
-having to wait to reload the database each time. However, it doesn't hot-reload.
+having to wait to reload the database each time. The shell watches the data
+files, and when either of them changes, it reloads the database in the
+background - commands keep running against the old database until the new one
+is ready, and then it's swapped in. Its `update` command applies a delta - a data file of new or changed
+NEOs, a data file of new close approaches, and designations of NEOs to remove -
+to the loaded database in place:
+
+    (neo) update --neofile neos-delta.csv --cadfile cad-delta.json
+    (neo) update --remove '2020 BS'
+
+The `serve` subcommand loads the NEO database once and answers `inspect` and
+`query` requests for it over local HTTP, so that other processes can reuse one
+warm database. Those subcommands become thin clients with `--server`:
+
+    $ python3 main.py serve --port 8765
+    $ python3 main.py query --server http://127.0.0.1:8765 --date 2020-03-14
+    $ python3 main.py inspect --server http://127.0.0.1:8765 --name Halley
 
 If needed, the script can load data from data files other than the default with
-`--neofile` or `--cadfile`.
+`--neofile` or `--cadfile`. The loaded database is saved as a binary snapshot
+next to the close approach data file, and restored from it while the data files
+are unchanged; `--no-snapshot` disables this. Otherwise, a large close approach
+data file is parsed in parallel by `--jobs` processes (by default, and at most,
+one per available CPU). If NumPy is installed, `--columnar` evaluates queries as vectorized masks over
+columns of approach data.
 """
 import argparse
 import cmd
+import concurrent.futures
 import datetime
+import os
 import pathlib
 import shlex
 import sys
+import threading
 import time
 
-from extract import load_neos, load_approaches
+from extract import available_cpus, load_neos, load_approaches
 from database import NEODatabase
-from filters import create_filters, limit
+from filters import create_filters
+from helpers import datetime_to_str
+from server import RemoteDatabase, serve
+from snapshot import load_snapshot, save_snapshot, snapshot_path
 from write import write_to_csv, write_to_json
 
 
@@ -57,6 +120,27 @@ DATA_ROOT = PROJECT_ROOT / 'data'
 # The current time, for use with the kill-on-change feature of the interactive shell.
 _START = time.time()
 
+# The value of `inspect --next` without a date. It stands for the date on which the
+# command runs, which may be later than the date on which the parser was built.
+_TODAY = object()
+
+
+def _stamp(paths):
+    """Describe the current version of some files by their modification times and sizes.
+
+    :param paths: A collection of paths to files.
+    :return: A tuple of `(mtime, size)` pairs, with `None` for any file that can't be accessed.
+    """
+    stamp = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stamp.append(None)
+        else:
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
+
 
 def date_fromisoformat(date_string):
     """Return a `datetime.date` corresponding to a string in YYYY-MM-DD format.
@@ -73,40 +157,12 @@ def date_fromisoformat(date_string):
         raise argparse.ArgumentTypeError(f"'{date_string}' is not a valid date. Use YYYY-MM-DD.")
 
 
-def make_parser():
-    """Create an ArgumentParser for this script.
+def add_filter_arguments(parser):
+    """Add the arguments that describe a collection of filters to a parser.
 
-    :return: A tuple of the top-level, inspect, and query parsers.
+    :param parser: The `argparse.ArgumentParser` of a subcommand that filters close approaches.
     """
-    parser = argparse.ArgumentParser(
-        description="Explore past and future close approaches of near-Earth objects."
-    )
-
-    # Add arguments for custom data files.
-    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
-                        type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
-    subparsers = parser.add_subparsers(dest='cmd')
-
-    # Add the `inspect` subcommand parser.
-    inspect = subparsers.add_parser('inspect',
-                                    description="Inspect an NEO by primary designation or by name.")
-    inspect.add_argument('-v', '--verbose', action='store_true',
-                         help="Additionally, print all known close approaches of this NEO.")
-    inspect_id = inspect.add_mutually_exclusive_group(required=True)
-    inspect_id.add_argument('-p', '--pdes',
-                            help="The primary designation of the NEO to inspect (e.g. '433').")
-    inspect_id.add_argument('-n', '--name',
-                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
-
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query',
-                                  description="Query for close approaches that "
-                                              "match a collection of filters.")
-    filters = query.add_argument_group('Filters',
+    filters = parser.add_argument_group('Filters',
                                        description="Filter close approaches by their attributes "
                                                    "or the attributes of their NEOs.")
     filters.add_argument('-d', '--date', type=date_fromisoformat,
@@ -144,22 +200,244 @@ def make_parser():
     filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
                          help="If specified, only return close approaches of NEOs that "
                               "are not potentially hazardous.")
+
+
+def filters_from_args(args):
+    """Create a collection of filters from the filter arguments of a subcommand.
+
+    :param args: The parsed arguments, including those added by `add_filter_arguments`.
+    :return: A collection of filters for use with the database's `query` method.
+    """
+    return create_filters(
+        date=args.date, start_date=args.start_date, end_date=args.end_date,
+        distance_min=args.distance_min, distance_max=args.distance_max,
+        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous
+    )
+
+
+def make_parser():
+    """Create an ArgumentParser for this script.
+
+    :return: A tuple of the top-level, inspect, query, stats, and update parsers.
+    """
+    parser = argparse.ArgumentParser(
+        description="Explore past and future close approaches of near-Earth objects."
+    )
+
+    # Add arguments for custom data files.
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
+                        type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
+                        type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Evaluate queries as vectorized masks over NumPy arrays. "
+                             "Requires NumPy.")
+    parser.add_argument('--compact-time', action='store_true',
+                        help="Store each close approach's time as an integer count of minutes, "
+                             "saving memory at the cost of slower access to times.")
+    parser.add_argument('-j', '--jobs', type=int, default=available_cpus(),
+                        help="The number of processes with which to parse a large close approach "
+                             "data file, at most one per CPU available to this process. Defaults "
+                             "to the number of those CPUs.")
+    parser.add_argument('--no-snapshot', dest='snapshot', action='store_false',
+                        help="Neither restore the database from, nor save it to, a binary "
+                             "snapshot next to the close approach data file.")
+    subparsers = parser.add_subparsers(dest='cmd')
+
+    # Add the `inspect` subcommand parser.
+    inspect = subparsers.add_parser('inspect',
+                                    description="Inspect an NEO by primary designation or by name.")
+    inspect.add_argument('-v', '--verbose', action='store_true',
+                         help="Additionally, print all known close approaches of this NEO.")
+    inspect.add_argument('--summary', action='store_true',
+                         help="Additionally, summarize the known close approaches of this NEO.")
+    inspect.add_argument('--next', nargs='?', const=_TODAY, type=date_fromisoformat,
+                         help="Additionally, print the first close approach of this NEO on or after "
+                              "the given date, in YYYY-MM-DD format (default: today).")
+    inspect_id = inspect.add_mutually_exclusive_group(required=True)
+    inspect_id.add_argument('-p', '--pdes',
+                            help="The primary designation of the NEO to inspect (e.g. '433').")
+    inspect_id.add_argument('-n', '--name',
+                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
+    inspect_id.add_argument('-s', '--search',
+                            help="List the NEOs whose names start with, or resemble, this text, "
+                                 "ignoring case (e.g. 'apoph').")
+    inspect.add_argument('--server',
+                         help="Inspect the NEO database served at this URL by the `serve` "
+                              "subcommand, instead of loading it (e.g. 'http://127.0.0.1:8765').")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query',
+                                  description="Query for close approaches that "
+                                              "match a collection of filters.")
+    add_filter_arguments(query)
     query.add_argument('-l', '--limit', type=int,
                        help="The maximum number of matches to return. "
                             "Defaults to 10 if no --outfile is given.")
+    query.add_argument('--sort', choices=('time', 'distance', 'velocity', 'diameter'),
+                       help="Return matches in order of this attribute, instead of in the "
+                            "database's internal order.")
+    query.add_argument('--desc', action='store_true',
+                       help="Return the largest values of the --sort attribute (by default, "
+                            "the latest times) first.")
+    query.add_argument('-w', '--workers', type=int,
+                       help="Scan a query that no index can narrow in parallel, across this "
+                            "many worker processes. Results are then returned in time order.")
     query.add_argument('-o', '--outfile', type=pathlib.Path,
                        help="File in which to save structured results. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--explain', action='store_true',
+                       help="Instead of returning results, describe the query plan and "
+                            "compare its estimated and actual number of matches.")
+    query.add_argument('--server',
+                       help="Query the NEO database served at this URL by the `serve` "
+                            "subcommand, instead of loading it (e.g. 'http://127.0.0.1:8765').")
+
+    # Add the `stats` subcommand parser.
+    stats = subparsers.add_parser('stats',
+                                  description="Summarize the close approaches that "
+                                              "match a collection of filters.")
+    add_filter_arguments(stats)
+    stats.add_argument('-b', '--by', choices=('year', 'month'),
+                       help="Additionally, count the matching close approaches in each "
+                            "calendar year or month.")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
-    return parser, inspect, query
+
+    server = subparsers.add_parser('serve',
+                                   description="Load the NEO database once and answer `inspect` "
+                                               "and `query` requests for it over local HTTP.")
+    server.add_argument('--host', default='127.0.0.1',
+                        help="The address on which to listen. Defaults to localhost.")
+    server.add_argument('--port', type=int, default=8765,
+                        help="The port on which to listen. Defaults to 8765.")
+
+    # The `update` command is only available in the interactive shell.
+    update = argparse.ArgumentParser(prog='update',
+                                     description="Apply a delta of NEOs and close approaches "
+                                                 "to the loaded database, without reloading it.")
+    update.add_argument('--neofile', type=pathlib.Path,
+                        help="Path to CSV file of new NEOs, or of NEOs that replace those with "
+                             "the same primary designations.")
+    update.add_argument('--cadfile', type=pathlib.Path,
+                        help="Path to JSON file of new close approach data.")
+    update.add_argument('--remove', nargs='+', default=(), metavar='PDES',
+                        help="The primary designations of NEOs to remove, along with their "
+                             "close approaches.")
+    return parser, inspect, query, stats, update
+
+
+def load_database(args):
+    """Load the `NEODatabase` described by the command-line arguments.
+
+    Unless disabled with `--no-snapshot`, the database is restored from a
+    snapshot next to the close approach data file if that snapshot is still
+    fresh. Otherwise, the data files are parsed and a new snapshot is saved for
+    next time (if the snapshot can't be written, the database is still used).
+    The NEO data file is parsed in a background thread while the close approach
+    data file is parsed, in chunks, by up to `--jobs` worker processes.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: The loaded `NEODatabase`.
+    :raises ImportError: If `--columnar` is given but NumPy isn't installed.
+    """
+    sources = (args.neofile, args.cadfile)
+    path = snapshot_path(args.cadfile)
+    if args.snapshot:
+        database = load_snapshot(path, sources, columnar=args.columnar,
+                                 compact_time=args.compact_time)
+        if database is not None:
+            return database
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        neos = executor.submit(load_neos, args.neofile)
+        approaches = load_approaches(args.cadfile, compact_time=args.compact_time, jobs=args.jobs)
+        neos = neos.result()
+    database = NEODatabase(neos, approaches, columnar=args.columnar)
+    if args.snapshot:
+        try:
+            save_snapshot(database, path, sources)
+        except OSError as err:
+            print(f"Unable to save a snapshot of the database: {err}", file=sys.stderr)
+    return database
+
+
+def summarize(neo):
+    """Print a summary of an NEO's known close approaches.
+
+    :param neo: A `NearEarthObject`.
+    """
+    print(f"- Known close approaches: {len(neo.approaches)}")
+    if neo.approaches:
+        print(f"- First: {neo.first_approach}")
+        print(f"- Last: {neo.last_approach}")
+        print(f"- Closest: {neo.closest_approach}")
+        print(f"- Fastest: {neo.fastest_approach}")
+
+
+def print_next_approach(neo, date):
+    """Print an NEO's first known close approach on or after a date.
+
+    :param neo: A `NearEarthObject`.
+    :param date: A `date`, or `_TODAY` for the current date.
+    """
+    if date is _TODAY:
+        date = datetime.date.today()
+    approach = neo.next_approach(datetime.datetime.combine(date, datetime.time.min))
+    if approach:
+        print(f"- Next on or after {date}: {approach}")
+    else:
+        print(f"- No known close approaches on or after {date}.")
 
 
-def inspect(database, pdes=None, name=None, verbose=False):
+def describe(neo, verbose=False, summary=False, next_date=None):
+    """Print information about an NEO, and optionally about its close approaches.
+
+    :param neo: A `NearEarthObject`.
+    :param verbose: Whether to additionally print all of the NEO's close approaches.
+    :param summary: Whether to additionally summarize the NEO's close approaches.
+    :param next_date: If given, additionally print the NEO's first close approach on or after this `date`.
+    """
+    print(neo)
+    if summary:
+        summarize(neo)
+    if next_date is not None:
+        print_next_approach(neo, next_date)
+    if verbose:
+        for approach in neo.approaches:
+            print(f"- {approach}")
+
+
+def search(database, text, limit=10, **options):
+    """Perform the `inspect --search` subcommand.
+
+    This function lists the NEOs whose names start with the given text, and
+    then those whose names resemble it, ignoring case.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param text: A partial or misspelled name.
+    :param limit: The maximum number of NEOs to list.
+    :param options: Keyword arguments for `describe`, applied to each matching NEO.
+    :return: A list of the matching `NearEarthObject`s.
+    """
+    neos = database.search_neos(prefix=text, fuzzy=text, limit=limit)
+    if not neos:
+        print("No matching NEOs exist in the database.", file=sys.stderr)
+    for neo in neos:
+        describe(neo, **options)
+    return neos
+
+
+def inspect(database, pdes=None, name=None, verbose=False, search_text=None, summary=False,
+            next_date=None):
     """Perform the `inspect` subcommand.
 
     This function fetches an NEO by designation or by name. If a matching NEO is
@@ -167,15 +445,22 @@ def inspect(database, pdes=None, name=None, verbose=False):
     all of the NEO's known close approaches is printed if `verbose=True`).
     Otherwise, a message is printed noting that there are no matching NEOs.
 
-    At least one of `pdes` and `name` must be given. If both are given, prefer
-    to look up the NEO by the primary designation.
+    At least one of `pdes`, `name` and `search_text` must be given. If several
+    are given, prefer to look up the NEO by the primary designation, then by
+    name. A search lists every NEO whose name matches (see `search`).
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param pdes: The primary designation of an NEO for which to search.
     :param name: The name of an NEO for which to search.
     :param verbose: Whether to additionally print all of a matching NEO's close approaches.
-    :return: The matching `NearEarthObject`, or None if not found.
+    :param search_text: A partial or misspelled name of the NEOs for which to search.
+    :param summary: Whether to additionally summarize a matching NEO's close approaches.
+    :param next_date: If given, additionally print a matching NEO's first close approach on or after this `date`.
+    :return: The matching `NearEarthObject`, or None if not found (or a list of NEOs, for a search).
     """
+    if not pdes and not name and search_text:
+        return search(database, search_text, verbose=verbose, summary=summary, next_date=next_date)
+
     # Fetch the NEO of interest.
     if pdes:
         neo = database.get_neo_by_designation(pdes)
@@ -187,11 +472,8 @@ def inspect(database, pdes=None, name=None, verbose=False):
         print("No matching NEOs exist in the database.", file=sys.stderr)
         return None
 
-    # Display information about this NEO, and optionally its close approaches if verbose.
-    print(neo)
-    if verbose:
-        for approach in neo.approaches:
-            print(f"- {approach}")
+    # Display information about this NEO, and optionally its close approaches.
+    describe(neo, verbose=verbose, summary=summary, next_date=next_date)
     return neo
 
 
@@ -199,7 +481,8 @@ def query(database, args):
     """Perform the `query` subcommand.
 
     Create a collection of filters with `create_filters` and supply them to the
-    database's `query` method to produce a stream of matching results.
+    database's `query` method to produce a stream of matching results, along
+    with the requested order and limit.
 
     If an output file wasn't given, print these results to stdout, limiting to
     10 entries if no limit was specified. If an output file was given, use the
@@ -210,30 +493,84 @@ def query(database, args):
     :param args: All arguments from the command line, as parsed by the top-level parser.
     """
     # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
-        date=args.date, start_date=args.start_date, end_date=args.end_date,
-        distance_min=args.distance_min, distance_max=args.distance_max,
-        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
-        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
-    )
-    # Query the database with the collection of filters.
-    results = database.query(filters)
+    filters = filters_from_args(args)
+    if args.explain:
+        print(database.explain(filters))
+        return
+
+    # Query the database with the collection of filters, limiting to 10 entries on stdout if not specified.
+    order_by = args.sort or ('time' if args.desc else None)
+    results = database.query(filters, order_by=order_by, descending=args.desc,
+                             limit=args.limit or (None if args.outfile else 10),
+                             workers=args.workers)
 
     if not args.outfile:
-        # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
+        # Write the results to stdout.
+        for result in results:
             print(result)
     else:
         # Write the results to a file.
         if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
+            write_to_csv(results, args.outfile)
         elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+            write_to_json(results, args.outfile)
         else:
             print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
 
 
+def stats(database, args):
+    """Perform the `stats` subcommand.
+
+    Print the number of close approaches that match the filters given at the
+    command line, and the range and mean of their distances, velocities and
+    NEO diameters. If requested, also print the number of matches in each
+    calendar year or month.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    filters = filters_from_args(args)
+    print(f"Close approaches: {database.count(filters)}")
+    first, last = database.min('time', filters), database.max('time', filters)
+    if first is not None:
+        print(f"Dates: {datetime_to_str(first)} to {datetime_to_str(last)}")
+    for field, unit in (('distance', 'au'), ('velocity', 'km/s'), ('diameter', 'km')):
+        mean = database.mean(field, filters)
+        if mean is None:
+            print(f"{field.capitalize()}: unknown")
+            continue
+        print(f"{field.capitalize()} ({unit}): min {database.min(field, filters):.6g}, "
+              f"max {database.max(field, filters):.6g}, mean {mean:.6g}")
+    if args.by:
+        for label, count in database.histogram(filters, by=args.by):
+            print(f"{label:>7}: {count}")
+
+
+def update(database, args, compact_time=False):
+    """Perform the `update` command of the interactive shell.
+
+    Remove the NEOs with the given designations, and then add the NEOs and
+    close approaches from the given delta files, updating the database in
+    place. Print how many records changed, and how long it took.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: The arguments of the `update` command, as parsed by its parser.
+    :param compact_time: Whether each new `CloseApproach` stores its time as an integer count of minutes.
+    """
+    start = time.perf_counter()
+    try:
+        neos = load_neos(args.neofile) if args.neofile else ()
+        approaches = load_approaches(args.cadfile, compact_time=compact_time) if args.cadfile else ()
+    except (OSError, ValueError) as err:
+        print(f"Unable to load the update: {err}", file=sys.stderr)
+        return
+    removed = database.remove_neos(args.remove)
+    database.add_neos(neos)
+    database.add_approaches(approaches)
+    print(f"Removed {len(removed)} NEOs, and added {len(neos)} NEOs and {len(approaches)} close approaches "
+          f"in {time.perf_counter() - start:.3f} s.")
+
+
 class NEOShell(cmd.Cmd):
     """Perform the `interactive` subcommand.
 
@@ -245,12 +582,18 @@ class NEOShell(cmd.Cmd):
     The primary purpose of this shell is to allow users to repeatedly perform
     inspect and query commands, while only loading the data (which can be quite
     slow) once.
+
+    If it's given the data files and a way to load them, the shell checks their
+    modification times and sizes before each command. When they change, a new
+    database is loaded by a background thread, and swapped in before the first
+    command after it's ready. Until then, commands use the old database.
     """
     intro = ("Explore close approaches of near-Earth objects. "
              "Type `help` or `?` to list commands and `exit` to exit.\n")
     prompt = '(neo) '
 
-    def __init__(self, database, inspect_parser, query_parser, aggressive=False, **kwargs):
+    def __init__(self, database, inspect_parser, query_parser, stats_parser=None, aggressive=False,
+                 update_parser=None, compact_time=False, reload=None, sources=(), **kwargs):
         """Create a new `NEOShell`.
 
         Creating this object doesn't start the session - for that, use `.cmdloop()`.
@@ -258,14 +601,29 @@ class NEOShell(cmd.Cmd):
         :param database: The `NEODatabase` containing data on NEOs and their close approaches.
         :param inspect_parser: The subparser for the `inspect` subcommand.
         :param query_parser: The subparser for the `query` subcommand.
+        :param stats_parser: The subparser for the `stats` subcommand.
         :param aggressive: Whether to kill the session whenever a project file is changed.
+        :param update_parser: The parser for the `update` command.
+        :param compact_time: Whether the database's close approaches store their times as counts of minutes.
+        :param reload: A function of no arguments that loads a new `NEODatabase` from the data files, or None.
+        :param sources: The paths to the data files to watch for changes.
         :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
         """
         super().__init__(**kwargs)
         self.db = database
         self.inspect = inspect_parser
         self.query = query_parser
+        self.stats = stats_parser
         self.aggressive = aggressive
+        self.update = update_parser
+        self.compact_time = compact_time
+        self.reload = reload
+        self.sources = tuple(sources)
+        self._stamp = _stamp(self.sources)
+        self._reloading = None
+        self._reloaded = None
+        # The project files to watch don't change during a session, so only list them once.
+        self._project_files = list(PROJECT_ROOT.glob('*.py'))
 
     @classmethod
     def parse_arg_with(cls, arg, parser):
@@ -309,15 +667,20 @@ class NEOShell(cmd.Cmd):
         Additionally, list all known close approaches:
 
             (neo) inspect --verbose --name Eros
+
+        List the NEOs whose names start with, or resemble, some text:
+
+            (neo) inspect --search apoph
         """
         args = self.parse_arg_with(arg, self.inspect)
         if not args:
             return
 
         # Run the `inspect` subcommand.
-        inspect(self.db,
+        inspect(RemoteDatabase(args.server) if args.server else self.db,
                 pdes=args.pdes, name=args.name,
-                verbose=args.verbose)
+                verbose=args.verbose, search_text=args.search,
+                summary=args.summary, next_date=args.next)
 
     def do_q(self, arg):
         """Shorthand for `query`."""
@@ -349,8 +712,49 @@ class NEOShell(cmd.Cmd):
         if not args:
             return
 
-        # Run the `inspect` subcommand.
-        query(self.db, args)
+        # Run the `query` subcommand.
+        query(RemoteDatabase(args.server) if args.server else self.db, args)
+
+    def do_stats(self, arg):
+        """Perform the `stats` subcommand within the REPL session.
+
+        Summarize the close approaches that match any of the `query` filters,
+        optionally counting them by calendar year or month:
+
+            (neo) stats --start-date 2020-01-01 --hazardous
+            (neo) stats --max-distance 0.05 --by year
+        """
+        if self.stats is None:
+            print("The `stats` command is unavailable in this session.", file=sys.stderr)
+            return
+        args = self.parse_arg_with(arg, self.stats)
+        if not args:
+            return
+
+        # Run the `stats` subcommand.
+        stats(self.db, args)
+
+    def do_update(self, arg):
+        """Apply a delta of NEOs and close approaches to the database within the REPL session.
+
+        Add the NEOs and close approaches in delta files, replacing any NEOs
+        with the same primary designations, and remove NEOs by designation:
+
+            (neo) update --neofile neos-delta.csv --cadfile cad-delta.json
+            (neo) update --remove '2020 BS'
+
+        A delta only changes the loaded database, so it's lost if the data files
+        change and the database is reloaded from them.
+        """
+        if self.update is None:
+            print("The `update` command is unavailable in this session.", file=sys.stderr)
+            return
+        args = self.parse_arg_with(arg, self.update)
+        if not args:
+            return
+
+        # Run the `update` command.
+        update(self.db, args, compact_time=self.compact_time)
 
     def do_EOF(self, _arg):
         """Exit the interactive session."""
@@ -360,9 +764,56 @@ class NEOShell(cmd.Cmd):
     do_exit = do_EOF
     do_quit = do_EOF
 
+    def _load(self, started):
+        """Load a new database in the background, and leave it (or the error) for `precmd` to pick up.
+
+        :param started: The `time.perf_counter()` value when the data files were seen to change.
+        """
+        try:
+            self._reloaded = (self.reload(), None, started)
+        except Exception as err:  # A half-written data file can fail to parse in many ways.
+            self._reloaded = (None, err, started)
+
+    def watch_sources(self):
+        """Start reloading the database if the data files have changed, and swap in a reloaded database.
+
+        Only one reload runs at a time. If the data files change again while
+        they're being reloaded, they are reloaded again once that finishes.
+        """
+        if self._reloading is not None:
+            if self._reloading.is_alive():
+                return
+            self._reloading = None
+            database, err, started = self._reloaded
+            self._reloaded = None
+            if err is not None:
+                print(f"Unable to reload the data files: {err}", file=sys.stderr)
+            else:
+                old, self.db = self.db, database
+                old.close()
+                print(f"Reloaded the database from the changed data files in "
+                      f"{time.perf_counter() - started:.3f} s.", file=sys.stderr)
+
+        if self.reload is None:
+            return
+        stamp = _stamp(self.sources)
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+        print("The data files have changed. Reloading them in the background.", file=sys.stderr)
+        self._reloading = threading.Thread(target=self._load, args=(time.perf_counter(),), daemon=True)
+        self._reloading.start()
+
     def precmd(self, line):
-        """Watch for changes to the files in this project."""
-        changed = [f for f in PROJECT_ROOT.glob('*.py') if f.stat().st_mtime > _START]
+        """Watch for changes to the data files and to the files in this project."""
+        self.watch_sources()
+        changed = []
+        for f in self._project_files:
+            try:
+                if f.stat().st_mtime > _START:
+                    changed.append(f)
+            except OSError:
+                changed.append(f)
         if changed:
             print("The following file(s) have been modified since this interactive session began: "
                   f"{', '.join(str(f.relative_to(PROJECT_ROOT)) for f in changed)}.",
@@ -378,19 +829,52 @@ class NEOShell(cmd.Cmd):
 
 def main():
     """Run the main script."""
-    parser, inspect_parser, query_parser = make_parser()
+    parser, inspect_parser, query_parser, stats_parser, update_parser = make_parser()
     args = parser.parse_args()
 
+    # A thin client doesn't need to load any data.
+    if args.cmd in ('inspect', 'query') and args.server:
+        database = RemoteDatabase(args.server)
+        try:
+            if args.cmd == 'inspect':
+                inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose,
+                        search_text=args.search, summary=args.summary, next_date=args.next)
+            else:
+                query(database, args)
+        except OSError as err:
+            print(f"Unable to reach the server at {args.server}: {err}", file=sys.stderr)
+        return
+
     # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    try:
+        database = load_database(args)
+    except ImportError as err:
+        print(err, file=sys.stderr)
+        return
 
     # Run the chosen subcommand.
-    if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
-    elif args.cmd == 'query':
-        query(database, args)
-    elif args.cmd == 'interactive':
-        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+    try:
+        if args.cmd == 'inspect':
+            inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose,
+                    search_text=args.search, summary=args.summary, next_date=args.next)
+        elif args.cmd == 'query':
+            query(database, args)
+        elif args.cmd == 'stats':
+            stats(database, args)
+        elif args.cmd == 'interactive':
+            shell = NEOShell(database, inspect_parser, query_parser, stats_parser,
+                             aggressive=args.aggressive, update_parser=update_parser,
+                             compact_time=args.compact_time, reload=lambda: load_database(args),
+                             sources=(args.neofile, args.cadfile))
+            try:
+                shell.cmdloop()
+            finally:
+                # The shell may have swapped in a reloaded database.
+                database = shell.db
+        elif args.cmd == 'serve':
+            serve(database, host=args.host, port=args.port)
+    finally:
+        database.close()
 
 
 if __name__ == '__main__':
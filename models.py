@@ -15,9 +15,25 @@ The functions that construct these objects use information extracted from the
 data files from NASA, so these objects should be able to handle all of the
 quirks of the data set, such as missing names and unknown diameters.
 
+Since the full data set holds hundreds of thousands of these objects, both
+classes use `__slots__` rather than a per-instance `__dict__`, and designations
+are interned so that each NEO and its approaches share a single string. A
+`CloseApproach` can optionally store its time as an integer count of minutes
+since the Unix epoch, deriving the `datetime` only when `time` is read.
+
+A `NearEarthObject` keeps its close approaches sorted by time, alongside a
+compact array of their times in minutes, so that the next approach after a
+given moment is found with a binary search. Its first, last, closest and
+fastest approaches are computed once and kept until another approach is added.
+
 You'll edit this file in Task 1.
 """
-from helpers import cd_to_datetime, datetime_to_str
+import array
+import bisect
+import datetime
+import sys
+
+from helpers import cd_to_datetime, datetime_to_str, datetime_to_minutes, minute_bounds, minutes_to_datetime
 from math import isnan
 
 
@@ -33,8 +49,9 @@ class NearEarthObject:
     initialized to an empty collection, but eventually populated in the
     `NEODatabase` constructor.
     """
+    __slots__ = ('designation', 'name', 'diameter', 'hazardous', 'approaches', 'extras', '_times', '_summary')
 
-    def __init__(self, designation, name='', diameter='nan', hazardous=False):
+    def __init__(self, designation, name='', diameter='nan', hazardous=False, extras=None):
         """Create a new `NearEarthObject`.
 
         :param designation: The primary designation for this NearEarthObject.
@@ -42,12 +59,16 @@ class NearEarthObject:
         :param diameter: The diameter, in kilometers, of this NearEarthObject.
         :param hazardous: Whether or not this NearEarthObject is potentially hazardous.
         :param approaches: A collection of this NearEarthObjects close approaches to Earth.
+        :param extras: A mapping of any additional columns loaded for this NearEarthObject, or None.
         """
-        self.designation = str(designation)
-        self.name = str(name) if name else None
-        self.diameter = float(diameter) if diameter else float('nan')
+        self.designation = sys.intern(str(designation))
+        self.name = sys.intern(str(name)) if name else None
+        self.diameter = float(diameter) if diameter not in ('', None) else float('nan')
         self.hazardous = bool(hazardous)
         self.approaches = []
+        self.extras = extras
+        self._times = None
+        self._summary = None
 
     @property
     def fullname(self):
@@ -70,6 +91,70 @@ class NearEarthObject:
         :param approach: CloseApproach object to be added to lists
         """
         self.approaches.append(approach)
+        self._times = None
+        self._summary = None
+
+    def remove_approach(self, approach):
+        """Remove a CloseApproach object from the list of approaches for object.
+
+        :param approach: CloseApproach object to be removed from lists
+        """
+        self.approaches.remove(approach)
+        self._times = None
+        self._summary = None
+
+    def summarize(self):
+        """Sort this NEO's close approaches by time, and precompute a summary of them.
+
+        This is done lazily by the summary properties, or eagerly by the
+        `NEODatabase` once every approach has been added.
+        """
+        self.approaches.sort(key=lambda approach: approach.time)
+        self._times = array.array('q', (datetime_to_minutes(approach.time) for approach in self.approaches))
+        if self.approaches:
+            self._summary = (min(self.approaches, key=lambda approach: approach.distance),
+                             max(self.approaches, key=lambda approach: approach.velocity))
+        else:
+            self._summary = (None, None)
+
+    @property
+    def first_approach(self):
+        """Return this NEO's earliest known close approach, or None."""
+        if self._summary is None:
+            self.summarize()
+        return self.approaches[0] if self.approaches else None
+
+    @property
+    def last_approach(self):
+        """Return this NEO's latest known close approach, or None."""
+        if self._summary is None:
+            self.summarize()
+        return self.approaches[-1] if self.approaches else None
+
+    @property
+    def closest_approach(self):
+        """Return this NEO's known close approach at the smallest distance, or None."""
+        if self._summary is None:
+            self.summarize()
+        return self._summary[0]
+
+    @property
+    def fastest_approach(self):
+        """Return this NEO's known close approach at the largest velocity, or None."""
+        if self._summary is None:
+            self.summarize()
+        return self._summary[1]
+
+    def next_approach(self, after):
+        """Find this NEO's first known close approach at or after a moment, with a binary search.
+
+        :param after: A `datetime`.
+        :return: The first `CloseApproach` at or after `after`, or None.
+        """
+        if self._summary is None:
+            self.summarize()
+        position = bisect.bisect_left(self._times, minute_bounds(after, None)[0])
+        return self.approaches[position] if position < len(self.approaches) else None
 
     def serialize(self):
         """Serialize NearEarthObject object.
@@ -97,21 +182,37 @@ class CloseApproach:
     private attribute, but the referenced NEO is eventually replaced in the
     `NEODatabase` constructor.
     """
+    __slots__ = ('_designation', '_time', 'distance', 'velocity', 'neo')
 
-    def __init__(self, designation, time, distance, velocity, neo=None):
+    def __init__(self, designation, time, distance, velocity, neo=None, compact_time=False):
         """Create a new `CloseApproach`.
 
-        :param time: The date and time, in UTC, at which the NEO passes closest to Earth.
+        :param designation: The primary designation of the NEO that is making a close approach to Earth.
+        :param time: The date and time, in UTC, at which the NEO passes closest to Earth, as a NASA calendar date string, a `datetime`, or an integer count of minutes since the Unix epoch.
         :param distance: The nominal approach distance, in astronomical units, of the NEO to Earth at the closest point.
         :param velocity: The velocity, in kilometers per second, of the NEO relative to Earth at the closest point.
         :param neo: The NearEarthObject that is making a close approach to Earth.
+        :param compact_time: Whether to store the time as an integer count of minutes, rather than as a `datetime`.
         """
-        self._designation = designation
-        self.time = cd_to_datetime(time)
+        self._designation = sys.intern(designation) if designation else designation
+        if isinstance(time, int):
+            self._time = time if compact_time else minutes_to_datetime(time)
+        else:
+            if not isinstance(time, datetime.datetime):
+                time = cd_to_datetime(time)
+            self._time = datetime_to_minutes(time) if compact_time else time
         self.distance = float(distance)
         self.velocity = float(velocity)
         self.neo = neo
 
+    @property
+    def time(self):
+        """Return the date and time, in UTC, at which the NEO passes closest to Earth, as a `datetime`."""
+        time = self._time
+        if type(time) is int:
+            return minutes_to_datetime(time)
+        return time
+
     @property
     def time_str(self):
         """Return a formatted representation of this `CloseApproach`'s approach time.
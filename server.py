@@ -0,0 +1,318 @@
+"""Serve an `NEODatabase` over local HTTP, and query it from a thin client.
+
+Loading the data set takes several seconds, so the `serve` subcommand of the
+main module loads an `NEODatabase` once and answers requests for it over HTTP,
+with one thread per request so that a long export doesn't hold up other
+clients. The endpoints are:
+
+- `GET /neo?designation=...` or `GET /neo?name=...`, which responds with a JSON
+  object holding the matching NEO and its close approaches (or 404).
+- `GET /search?prefix=...&fuzzy=...&limit=...`, which responds with a JSON list
+  of the serialized NEOs found by `NEODatabase.search_neos`.
+- `GET /query?filter=...`, which streams the matching close approaches as JSON
+  lines, each formatted like an element of the output of `write_to_json`. The
+  optional `sort`, `desc`, `limit` and `workers` parameters are passed on as the
+  corresponding arguments of `NEODatabase.query`.
+- `GET /explain?filter=...`, which responds with the database's description of
+  the query plan, as plain text.
+
+Each `filter` parameter encodes one filter from `create_filters` as
+`<class>:<operator>:<value>`, for example `DateFilter:ge:2020-01-01`.
+
+A `RemoteDatabase` is the client side: it offers the same lookup and query
+methods as `NEODatabase`, so the main module's `inspect` and `query` functions
+(and the writers in `write`) work with it unchanged.
+"""
+import datetime
+import http.server
+import json
+import operator
+import os
+import socketserver
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import filters
+from models import NearEarthObject, CloseApproach
+
+
+# The comparators that may appear in an encoded filter.
+_OPERATORS = {name: getattr(operator, name) for name in ('eq', 'ne', 'lt', 'le', 'gt', 'ge')}
+
+# The most worker processes that a client may ask a sharded query to use.
+_MAX_WORKERS = os.cpu_count() or 1
+
+# The number of NEOs a name search returns by default, and at most.
+_SEARCH_LIMIT = 10
+_MAX_SEARCH_LIMIT = 1000
+
+def _decode_bool(value):
+    """Decode a boolean encoded by `str`, rejecting any other text."""
+    if value not in ('True', 'False'):
+        raise ValueError(f"Invalid boolean {value!r}; use 'True' or 'False'.")
+    return value == 'True'
+
+
+# Functions that decode the reference value of each kind of encoded filter.
+_FILTER_VALUES = {
+    'DateFilter': lambda value: datetime.datetime.strptime(value, '%Y-%m-%d').date(),
+    'DistanceFilter': float,
+    'VelocityFilter': float,
+    'DiameterFilter': float,
+    'HazardFilter': _decode_bool,
+}
+
+
+def encode_filter(approach_filter):
+    """Encode a filter as a `<class>:<operator>:<value>` string.
+
+    :param approach_filter: An `AttributeFilter`, such as one produced by `create_filters`.
+    :return: The filter, encoded as a string.
+    """
+    value = approach_filter.value
+    if isinstance(value, datetime.date):
+        value = value.isoformat()
+    return f"{type(approach_filter).__name__}:{approach_filter.op.__name__}:{value}"
+
+
+def decode_filter(text):
+    """Decode a filter encoded by `encode_filter`.
+
+    :param text: The encoded filter.
+    :return: An equivalent `AttributeFilter`.
+    :raises ValueError: If the text doesn't describe a known filter.
+    """
+    name, op, value = text.split(':', 2)
+    if name not in _FILTER_VALUES or op not in _OPERATORS:
+        raise ValueError(f"Unknown filter {text!r}.")
+    return getattr(filters, name)(_OPERATORS[op], _FILTER_VALUES[name](value))
+
+
+def _serialize_approach(approach):
+    """Serialize a close approach and its NEO, as in the output of `write_to_json`."""
+    return {**approach.serialize(), "neo": approach.neo.serialize()}
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """An HTTP server that handles each request in its own thread."""
+    daemon_threads = True
+
+
+class _NEORequestHandler(http.server.BaseHTTPRequestHandler):
+    """Answer requests for the `NEODatabase` attached to the server."""
+
+    def do_GET(self):
+        """Dispatch a GET request to the handler for its path."""
+        url = urllib.parse.urlsplit(self.path)
+        # Keep blank values, so that a search for the empty prefix (every name) reaches the database.
+        params = urllib.parse.parse_qs(url.query, keep_blank_values=True)
+        handler = {'/neo': self._neo, '/search': self._search, '/query': self._query,
+                   '/explain': self._explain}.get(url.path)
+        if handler is None:
+            self.send_error(404, f"Unknown endpoint {url.path!r}.")
+            return
+        try:
+            handler(params)
+        except ValueError as err:
+            self.send_error(400, str(err))
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, for example because it reached its limit.
+            pass
+
+    def _send_headers(self, content_type, length=None):
+        """Start a successful response of the given content type."""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if length is not None:
+            self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+    def _filters(self, params):
+        """Decode the filters of a query from its parameters."""
+        return tuple(decode_filter(text) for text in params.get('filter', ()))
+
+    def _neo(self, params):
+        """Respond with an NEO, looked up by designation or by name, and its approaches."""
+        database = self.server.database
+        if 'designation' in params:
+            neo = database.get_neo_by_designation(params['designation'][0])
+        elif 'name' in params:
+            neo = database.get_neo_by_name(params['name'][0])
+        else:
+            raise ValueError("Either a designation or a name is required.")
+        if not neo:
+            self.send_error(404, "No matching NEOs exist in the database.")
+            return
+        body = json.dumps({'neo': neo.serialize(),
+                           'approaches': [approach.serialize() for approach in neo.approaches]})
+        body = body.encode('utf-8')
+        self._send_headers('application/json', len(body))
+        self.wfile.write(body)
+
+    def _search(self, params):
+        """Respond with the NEOs that match a partial or misspelled name, at most `_MAX_SEARCH_LIMIT` of them."""
+        limit = params.get('limit')
+        neos = self.server.database.search_neos(prefix=params.get('prefix', [None])[0],
+                                                fuzzy=params.get('fuzzy', [None])[0],
+                                                limit=min(int(limit[0]) if limit else _SEARCH_LIMIT,
+                                                          _MAX_SEARCH_LIMIT))
+        body = json.dumps([neo.serialize() for neo in neos]).encode('utf-8')
+        self._send_headers('application/json', len(body))
+        self.wfile.write(body)
+
+    def _query(self, params):
+        """Stream the approaches that match a query, one JSON object per line."""
+        limit = params.get('limit')
+        results = self.server.database.query(self._filters(params),
+                                             order_by=params.get('sort', [None])[0],
+                                             descending='desc' in params,
+                                             limit=int(limit[0]) if limit else None,
+                                             workers=min(int(params.get('workers', [0])[0]), _MAX_WORKERS))
+        self._send_headers('application/x-ndjson')
+        encode = json.JSONEncoder().encode
+        for approach in results:
+            self.wfile.write(encode(_serialize_approach(approach)).encode('utf-8') + b'\n')
+
+    def _explain(self, params):
+        """Respond with a description of the plan for a query."""
+        body = self.server.database.explain(self._filters(params)).encode('utf-8')
+        self._send_headers('text/plain; charset=utf-8', len(body))
+        self.wfile.write(body)
+
+
+def make_server(database, host='127.0.0.1', port=8765):
+    """Create an HTTP server that answers requests for a database.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param host: The address on which to listen.
+    :param port: The port on which to listen, or 0 to pick a free port.
+    :return: The server, ready for `serve_forever`.
+    """
+    server = _ThreadingHTTPServer((host, port), _NEORequestHandler)
+    server.database = database
+    return server
+
+
+def serve(database, host='127.0.0.1', port=8765):
+    """Answer requests for a database until interrupted.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param host: The address on which to listen.
+    :param port: The port on which to listen.
+    """
+    with make_server(database, host, port) as server:
+        print(f"Serving the NEO database on http://{host}:{server.server_address[1]}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class RemoteDatabase:
+    """A client for an `NEODatabase` served by `serve`.
+
+    A `RemoteDatabase` offers the lookup and query methods of `NEODatabase`.
+    The NEOs and close approaches it returns are rebuilt from the server's
+    responses, so they're independent of the server's objects.
+    """
+
+    def __init__(self, url):
+        """Create a new `RemoteDatabase`.
+
+        :param url: The base URL of the server, such as `http://127.0.0.1:8765`.
+        """
+        self.url = url.rstrip('/')
+
+    def _open(self, endpoint, params):
+        """Send a GET request to an endpoint, returning the open response, or `None` on 404."""
+        url = f"{self.url}{endpoint}?{urllib.parse.urlencode(params, doseq=True)}"
+        try:
+            return urllib.request.urlopen(url)
+        except urllib.error.HTTPError as err:
+            if err.code == 404:
+                return None
+            raise
+
+    def _get_neo(self, params):
+        """Fetch an NEO and its close approaches, or `None` if there is no match."""
+        response = self._open('/neo', params)
+        if response is None:
+            return None
+        with response:
+            data = json.load(response)
+        neo = _build_neo(data['neo'])
+        for serialized in data['approaches']:
+            neo.add_approach(_build_approach(serialized, neo))
+        return neo
+
+    def get_neo_by_designation(self, designation):
+        """Find and return an NEO by its primary designation, or `None`."""
+        return self._get_neo({'designation': designation})
+
+    def get_neo_by_name(self, name):
+        """Find and return an NEO by its name, or `None`."""
+        return self._get_neo({'name': name})
+
+    def search_neos(self, prefix=None, fuzzy=None, limit=10):
+        """Search for NEOs by partial or misspelled name, without their close approaches.
+
+        The server returns at most `_MAX_SEARCH_LIMIT` NEOs, and `_SEARCH_LIMIT`
+        of them if `limit` is `None`.
+        """
+        params = {key: value for key, value in (('prefix', prefix), ('fuzzy', fuzzy), ('limit', limit))
+                  if value is not None}
+        with self._open('/search', params) as response:
+            return [_build_neo(serialized) for serialized in json.load(response)]
+
+    def query(self, filters=(), order_by=None, descending=False, limit=None, workers=None):
+        """Generate the close approaches that match a collection of filters.
+
+        The results are streamed from the server, which stops scanning as soon
+        as this stream is closed.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param order_by: The field by which to order the results, or `None` for the server's internal order.
+        :param descending: Whether to generate the largest values of `order_by` first.
+        :param limit: The maximum number of approaches to generate, or `None` for no limit.
+        :param workers: The number of worker processes with which the server should scan the approaches.
+        :return: A stream of matching `CloseApproach` objects.
+        """
+        neos = {}
+        params = {'filter': [encode_filter(approach_filter) for approach_filter in filters]}
+        if order_by is not None:
+            params['sort'] = order_by
+        if descending:
+            params['desc'] = 1
+        if limit is not None:
+            params['limit'] = limit
+        if workers:
+            params['workers'] = workers
+        with self._open('/query', params) as response:
+            for line in response:
+                serialized = json.loads(line)
+                designation = serialized['neo']['designation']
+                neo = neos.get(designation)
+                if neo is None:
+                    neo = neos[designation] = _build_neo(serialized['neo'])
+                yield _build_approach(serialized, neo)
+
+    def explain(self, filters=()):
+        """Describe how the server would execute a query."""
+        params = {'filter': [encode_filter(approach_filter) for approach_filter in filters]}
+        with self._open('/explain', params) as response:
+            return response.read().decode('utf-8')
+
+
+def _build_neo(serialized):
+    """Rebuild a `NearEarthObject` from its serialized form."""
+    return NearEarthObject(serialized['designation'], serialized['name'],
+                           serialized['diameter_km'], serialized['potentially_hazardous'])
+
+
+def _build_approach(serialized, neo):
+    """Rebuild a `CloseApproach` of an NEO from its serialized form."""
+    time = datetime.datetime.strptime(serialized['datetime_utc'], '%Y-%m-%d %H:%M')
+    return CloseApproach(neo.designation, time, serialized['distance_au'],
+                         serialized['velocity_km_s'], neo=neo)
@@ -0,0 +1,191 @@
+"""A query engine that scans shards of the close approaches in worker processes.
+
+A query that no index can narrow is a full scan, which runs on a single core in
+the main process. A `ShardedExecutor` instead copies the queryable fields of
+every close approach - approach times (as integer minutes since the Unix
+epoch), distances, velocities, and the diameter and hazardous flag of each
+approach's NEO - into blocks of `multiprocessing.shared_memory`, sorted by
+time. Those columns are split into contiguous shards, each covering a range of
+time, and a pool of worker processes attaches to the blocks once and scans
+shards in parallel.
+
+Each worker checks the filters that can be expressed as an interval on one of
+those fields, and sends back the positions of the matching approaches. Since
+the shards are ordered by time, concatenating their results in shard order
+yields the matches in time order, without any further merging; the main
+process checks any remaining filters on the `CloseApproach` objects as the
+results stream in.
+
+Shared memory requires Python 3.8+. If it isn't available, asking for a
+`ShardedExecutor` raises an `ImportError`.
+"""
+import array
+import bisect
+import concurrent.futures
+import math
+import multiprocessing
+import weakref
+
+from helpers import datetime_to_minutes, minute_bounds
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover - depends on the Python version.
+    shared_memory = None
+
+
+# The start method of the worker processes. Queries may come from the threads of
+# the HTTP server, and forking a multi-threaded process can deadlock, so the
+# workers are forked from a single-threaded fork server where there is one.
+_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None)
+
+# The typecode of each shared column. The `row` column maps positions in time
+# order back to positions in `NEODatabase._approaches`.
+_COLUMNS = {'row': 'q', 'time': 'q', 'distance': 'd', 'velocity': 'd', 'diameter': 'd', 'hazardous': 'b'}
+
+# The number of shards per worker process, so that a slow shard doesn't hold up
+# the others, and the first results arrive early.
+_SHARDS_PER_WORKER = 4
+
+# The shared columns attached by this worker process, and the blocks backing them.
+_worker_columns = None
+_worker_blocks = None
+
+
+def _attach(names, count):
+    """Attach a worker process to the shared columns, once, when it starts."""
+    global _worker_columns, _worker_blocks
+    _worker_blocks = {field: shared_memory.SharedMemory(name=name) for field, name in names.items()}
+    _worker_columns = {field: block.buf.cast(_COLUMNS[field])[:count] for field, block in _worker_blocks.items()}
+
+
+def _scan(start, stop, bounds):
+    """Scan a shard of the shared columns in a worker process.
+
+    :param start: The first position, in time order, of the shard.
+    :param stop: The position just past the end of the shard.
+    :param bounds: A mapping from field names to closed `(low, high)` intervals of column values.
+    :return: The positions in `NEODatabase._approaches` of the matching approaches, in time order, as bytes.
+    """
+    columns = _worker_columns
+    times = columns['time']
+    low, high = bounds.get('time', (None, None))
+    if low is not None:
+        start = bisect.bisect_left(times, low, start, stop)
+    if high is not None:
+        stop = bisect.bisect_right(times, high, start, stop)
+
+    checks = [(columns[field], low, high) for field, (low, high) in bounds.items() if field != 'time']
+    rows = columns['row']
+    matched = array.array('q')
+    for position in range(start, stop):
+        for column, low, high in checks:
+            value = column[position]
+            if (low is not None and not value >= low) or (high is not None and not value <= high):
+                break
+        else:
+            matched.append(rows[position])
+    return matched.tobytes()
+
+
+def _release(executor, blocks):
+    """Shut down the worker processes and free the shared memory blocks."""
+    executor.shutdown(wait=True)
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+class ShardedExecutor:
+    """A pool of worker processes that scan time-ordered shards of close approach columns.
+
+    The columns are built once, from linked approaches, and are read-only
+    thereafter. The worker processes and shared memory are released by
+    `close`, or when the executor is garbage-collected.
+    """
+
+    def __init__(self, approaches, time_order, workers):
+        """Create a new `ShardedExecutor`, and start its worker processes.
+
+        :param approaches: A collection of `CloseApproach`es, linked to their NEOs.
+        :param time_order: The positions of the approaches, sorted by time.
+        :param workers: The number of worker processes.
+        :raises ImportError: If `multiprocessing.shared_memory` isn't available.
+        """
+        if shared_memory is None:
+            raise ImportError("Sharded queries require multiprocessing.shared_memory (Python 3.8+).")
+        self.workers = workers
+        count = len(time_order)
+        values = {
+            'row': time_order,
+            'time': (datetime_to_minutes(approaches[row].time) for row in time_order),
+            'distance': (approaches[row].distance for row in time_order),
+            'velocity': (approaches[row].velocity for row in time_order),
+            'diameter': (approaches[row].neo.diameter if approaches[row].neo else math.nan
+                         for row in time_order),
+            'hazardous': (approaches[row].neo.hazardous if approaches[row].neo else -1
+                          for row in time_order),
+        }
+        blocks = []
+        try:
+            for field, typecode in _COLUMNS.items():
+                column = array.array(typecode, values[field])
+                block = shared_memory.SharedMemory(create=True, size=max(len(column) * column.itemsize, 1))
+                blocks.append(block)
+                block.buf[:len(column) * column.itemsize] = column.tobytes()
+            names = {field: block.name for field, block in zip(_COLUMNS, blocks)}
+            executor = concurrent.futures.ProcessPoolExecutor(workers, mp_context=_MP_CONTEXT,
+                                                              initializer=_attach, initargs=(names, count))
+        except BaseException:
+            for block in blocks:
+                block.close()
+                block.unlink()
+            raise
+        self._executor = executor
+        self._finalizer = weakref.finalize(self, _release, executor, blocks)
+
+        shards = max(1, min(count, workers * _SHARDS_PER_WORKER))
+        self.shards = [(count * shard // shards, count * (shard + 1) // shards) for shard in range(shards)]
+
+    def rows(self, filters):
+        """Find the approaches that match a collection of filters, scanning the shards in parallel.
+
+        Filters that can't be expressed as an interval on a shared column
+        aren't evaluated here; they're returned so that the caller can check
+        them on the matching approaches.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A tuple of a stream of approach positions, in time order, and the filters left unevaluated.
+        """
+        bounds = {}
+        residual = []
+        for approach_filter in filters:
+            interval = approach_filter.interval()
+            if interval is None or approach_filter.field not in _COLUMNS:
+                residual.append(approach_filter)
+                continue
+            if approach_filter.field == 'time':
+                interval = minute_bounds(*interval)
+            low, high = bounds.get(approach_filter.field, (None, None))
+            new_low, new_high = interval
+            if new_low is not None and (low is None or new_low > low):
+                low = new_low
+            if new_high is not None and (high is None or new_high < high):
+                high = new_high
+            bounds[approach_filter.field] = (low, high)
+        return self._merge(bounds), tuple(residual)
+
+    def _merge(self, bounds):
+        """Generate the positions matched by every shard, in shard order, cancelling the rest if closed early."""
+        futures = [self._executor.submit(_scan, start, stop, bounds) for start, stop in self.shards]
+        try:
+            for future in futures:
+                yield from array.array('q', future.result())
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        """Shut down the worker processes and free the shared memory."""
+        self._finalizer()
@@ -0,0 +1,252 @@
+"""Save and restore a loaded `NEODatabase` as a compact binary snapshot.
+
+Parsing `neos.csv` and `cad.json` and building an `NEODatabase` from them takes
+several seconds on the full data set. A snapshot stores the same data as flat
+binary arrays - one per field of the NEOs and close approaches, plus the sorted
+order of each of the database's indexes - so that it can be restored without
+parsing any text.
+
+A snapshot records the size, modification time and SHA-256 hash of the data
+files it was built from. The `load_snapshot` function only restores a snapshot
+whose data files haven't changed since; otherwise, it returns `None` and the
+caller is expected to rebuild the database and save a fresh snapshot with
+`save_snapshot`. If a data file was only touched, its new modification time is
+written back into the snapshot's header, so that it's only hashed once.
+
+The file layout is a magic number, a length-prefixed JSON header, and then the
+raw contents of each array, aligned to 8 bytes. Arrays are read back through a
+memory map of the file.
+"""
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from database import NEODatabase
+from helpers import datetime_to_minutes
+from models import NearEarthObject, CloseApproach
+
+
+# The first bytes of every snapshot file, including the format version.
+_MAGIC = b'NEOSNAP1'
+_HEADER_LENGTH = struct.Struct('<Q')
+_ALIGNMENT = 8
+
+# The spare bytes reserved after the JSON header, so that it can be rewritten in
+# place with new modification times even if they're written with more digits.
+_HEADER_SLACK = 64
+
+
+def snapshot_path(cad_json_path):
+    """Return the default path of the snapshot for a close approach data file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: A path next to that file, with a `.snapshot` suffix.
+    """
+    return cad_json_path.with_suffix('.snapshot')
+
+
+def _file_digest(path):
+    """Compute the SHA-256 hash of a file's contents, as a hexadecimal string."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _describe_sources(paths):
+    """Describe the size, modification time and hash of each data file."""
+    sources = []
+    for path in paths:
+        stat = os.stat(path)
+        sources.append({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _file_digest(path)})
+    return sources
+
+
+def _sources_are_fresh(recorded, paths):
+    """Decide whether the data files still match the ones a snapshot was built from.
+
+    A file whose size and modification time are unchanged is assumed to be
+    unchanged. A file that was only touched is recognized by its hash, and its
+    new modification time is stored in `recorded`.
+    """
+    if len(recorded) != len(paths):
+        return False
+    for source, path in zip(recorded, paths):
+        stat = os.stat(path)
+        if stat.st_size != source['size']:
+            return False
+        if stat.st_mtime_ns != source['mtime_ns']:
+            if _file_digest(path) != source['sha256']:
+                return False
+            source['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+
+def _rewrite_header(path, header, length):
+    """Replace the header of a snapshot file in place, if the new header fits in the space of the old one.
+
+    The snapshot is only a cache, so if the header can't be rewritten, the
+    data files are simply hashed again by the next `load_snapshot`.
+
+    :param path: A Path-like object pointing to the snapshot.
+    :param header: The new header, as a dictionary.
+    :param length: The number of bytes of the old header, including its padding.
+    """
+    encoded = json.dumps(header).encode('utf-8')
+    if len(encoded) > length:
+        return
+    try:
+        with open(path, 'r+b') as snapshot:
+            snapshot.seek(len(_MAGIC) + _HEADER_LENGTH.size)
+            snapshot.write(encoded + b' ' * (length - len(encoded)))
+    except OSError:
+        pass
+
+
+def _text_blob(strings):
+    """Join strings that contain no newlines into a single UTF-8 byte array."""
+    return array.array('B', '\n'.join(strings).encode('utf-8'))
+
+
+def _split_blob(view, count):
+    """Split a UTF-8 byte array built by `_text_blob` back into `count` strings."""
+    if not count:
+        return []
+    return bytes(view).decode('utf-8').split('\n')
+
+
+def save_snapshot(database, path, sources):
+    """Save a snapshot of a database to a file.
+
+    The file is written to a temporary path first and then moved into place,
+    so a concurrent reader never sees a partially-written snapshot.
+
+    :param database: The `NEODatabase` to save.
+    :param path: A Path-like object pointing to where the snapshot should be saved.
+    :param sources: The paths of the data files the database was loaded from.
+    """
+    neos = list(database._neos.values())
+    approaches = database._approaches
+    positions = {id(neo): position for position, neo in enumerate(neos)}
+    unlinked = [approach._designation for approach in approaches if approach.neo is None]
+
+    columns = {
+        'neo_designations': _text_blob(neo.designation for neo in neos),
+        'neo_names': _text_blob(neo.name or '' for neo in neos),
+        'neo_diameters': array.array('d', (neo.diameter for neo in neos)),
+        'neo_hazardous': array.array('B', (neo.hazardous for neo in neos)),
+        'approach_neos': array.array('q', (positions.get(id(approach.neo), -1) for approach in approaches)),
+        'approach_designations': _text_blob(designation or '' for designation in unlinked),
+        'approach_times': array.array('q', (datetime_to_minutes(approach.time) for approach in approaches)),
+        'approach_distances': array.array('d', (approach.distance for approach in approaches)),
+        'approach_velocities': array.array('d', (approach.velocity for approach in approaches)),
+    }
+    for field, index in database._indexes.items():
+        columns[f'index_{field}'] = array.array('q', index.rows)
+
+    sections = {}
+    offset = 0
+    for name, column in columns.items():
+        length = len(column) * column.itemsize
+        sections[name] = {'typecode': column.typecode, 'offset': offset, 'length': length}
+        offset += -(-length // _ALIGNMENT) * _ALIGNMENT
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'sources': _describe_sources(sources),
+        'neos': len(neos),
+        'approaches': len(approaches),
+        'unlinked': len(unlinked),
+        'sections': sections,
+    }).encode('utf-8')
+    start = len(_MAGIC) + _HEADER_LENGTH.size + len(header)
+    padding = _HEADER_SLACK + -(start + _HEADER_SLACK) % _ALIGNMENT
+
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as outfile:
+        outfile.write(_MAGIC)
+        outfile.write(_HEADER_LENGTH.pack(len(header) + padding))
+        outfile.write(header + b' ' * padding)
+        for name, column in columns.items():
+            column.tofile(outfile)
+            outfile.write(b'\0' * (-sections[name]['length'] % _ALIGNMENT))
+    os.replace(temporary, path)
+
+
+def _read_header(snapshot):
+    """Read the header of a memory-mapped snapshot.
+
+    :return: A tuple of the decoded header and the offset at which the arrays begin.
+    :raises ValueError: If the file isn't a snapshot in this format.
+    """
+    if snapshot[:len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not a snapshot file.")
+    start = len(_MAGIC) + _HEADER_LENGTH.size
+    length, = _HEADER_LENGTH.unpack_from(snapshot, len(_MAGIC))
+    header = json.loads(snapshot[start:start + length].decode('utf-8'))
+    return header, start + length
+
+
+def load_snapshot(path, sources, columnar=False, compact_time=False):
+    """Restore a database from a snapshot, if the snapshot is fresh.
+
+    :param path: A Path-like object pointing to a snapshot saved by `save_snapshot`.
+    :param sources: The paths of the data files the database should reflect.
+    :param columnar: Whether the restored database should answer queries with the NumPy columnar engine.
+    :param compact_time: Whether each restored `CloseApproach` stores its time as an integer count of minutes.
+    :return: The restored `NEODatabase`, or `None` if the snapshot is missing, stale or unreadable.
+    """
+    try:
+        with open(path, 'rb') as infile, \
+                mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as snapshot:
+            header, base = _read_header(snapshot)
+            recorded = json.dumps(header['sources'])
+            if header['byteorder'] != sys.byteorder or not _sources_are_fresh(header['sources'], sources):
+                return None
+            touched = json.dumps(header['sources']) != recorded
+            views = [memoryview(snapshot)]
+            columns = {}
+            try:
+                for name, section in header['sections'].items():
+                    start = base + section['offset']
+                    views.append(views[0][start:start + section['length']])
+                    views.append(views[-1].cast(section['typecode']))
+                    columns[name] = views[-1]
+                neos, approaches, indexes = _restore(header, columns, compact_time)
+            finally:
+                # The memory map can only be closed once no views of it remain.
+                for view in reversed(views):
+                    view.release()
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+    if touched:
+        _rewrite_header(path, header, base - len(_MAGIC) - _HEADER_LENGTH.size)
+    return NEODatabase(neos, approaches, columnar=columnar, indexes=indexes)
+
+
+def _restore(header, columns, compact_time):
+    """Rebuild unlinked NEOs and close approaches, and the index orders, from snapshot arrays."""
+    designations = _split_blob(columns['neo_designations'], header['neos'])
+    names = _split_blob(columns['neo_names'], header['neos'])
+    neos = tuple(NearEarthObject(designation, name, diameter, hazardous)
+                 for designation, name, diameter, hazardous
+                 in zip(designations, names, columns['neo_diameters'], columns['neo_hazardous']))
+
+    unlinked = iter(_split_blob(columns['approach_designations'], header['unlinked']))
+    approaches = tuple(
+        CloseApproach(designations[neo] if neo >= 0 else next(unlinked) or None,
+                      minutes, distance, velocity, compact_time=compact_time)
+        for neo, minutes, distance, velocity
+        in zip(columns['approach_neos'], columns['approach_times'],
+               columns['approach_distances'], columns['approach_velocities'])
+    )
+    if len(approaches) != header['approaches']:
+        raise ValueError("Truncated snapshot.")
+
+    indexes = {name[len('index_'):]: column.tolist()
+               for name, column in columns.items() if name.startswith('index_')}
+    return neos, approaches, indexes
@@ -0,0 +1,94 @@
+"""Check that the NumPy columnar engine produces the same results as `query`.
+
+These tests are skipped if NumPy isn't installed.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_columnar
+"""
+import datetime
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from models import CloseApproach
+from filters import create_filters
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed.")
+class TestColumnarQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.columnar_db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE),
+                                      columnar=True)
+
+    def assertSameResults(self, filters):
+        expected = [(approach.neo.designation, approach.time) for approach in self.db.query(filters)]
+        received = [(approach.neo.designation, approach.time) for approach in self.columnar_db.query(filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(expected, received)
+
+    def test_query_all(self):
+        self.assertSameResults(create_filters())
+
+    def test_query_on_date(self):
+        self.assertSameResults(create_filters(date=datetime.date(2020, 3, 2)))
+
+    def test_query_with_date_range_and_distance_bounds(self):
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 3, 1),
+                                              end_date=datetime.date(2020, 3, 31),
+                                              distance_min=0.05, distance_max=0.3))
+
+    def test_query_with_velocity_diameter_and_hazard(self):
+        self.assertSameResults(create_filters(velocity_min=5, velocity_max=25,
+                                              diameter_min=0.1, hazardous=True))
+
+    def test_query_with_not_hazardous(self):
+        self.assertSameResults(create_filters(hazardous=False, diameter_max=1.5))
+
+    def test_aggregations(self):
+        for filters in (create_filters(), create_filters(distance_max=0.1, hazardous=False)):
+            self.assertEqual(self.columnar_db.count(filters), self.db.count(filters))
+            self.assertEqual(self.columnar_db.histogram(filters, by='month'),
+                             self.db.histogram(filters, by='month'))
+            for field in ('time', 'distance', 'velocity', 'diameter'):
+                self.assertEqual(self.columnar_db.min(field, filters), self.db.min(field, filters))
+                self.assertEqual(self.columnar_db.max(field, filters), self.db.max(field, filters))
+            for field in ('distance', 'velocity', 'diameter'):
+                self.assertAlmostEqual(self.columnar_db.mean(field, filters), self.db.mean(field, filters))
+
+    def test_added_approaches_are_queried(self):
+        approaches = load_approaches(TEST_CAD_FILE)
+        db = NEODatabase(load_neos(TEST_NEO_FILE), approaches[:100], columnar=True)
+        db.add_approaches(approaches[100:])
+        filters = create_filters(velocity_min=5, diameter_min=0.1, hazardous=True)
+        self.assertEqual(sorted((approach.neo.designation, approach.time) for approach in db.query(filters)),
+                         sorted((approach.neo.designation, approach.time) for approach in self.db.query(filters)))
+
+    def test_unlinked_approaches_match_no_neo_filters(self):
+        approaches = load_approaches(TEST_CAD_FILE) + (CloseApproach('not-a-real-neo', '2020-Mar-02 12:00', 0.1, 10),)
+        db = NEODatabase(load_neos(TEST_NEO_FILE), approaches)
+        columnar_db = NEODatabase(load_neos(TEST_NEO_FILE), approaches, columnar=True)
+        for filters in (create_filters(hazardous=False), create_filters(hazardous=True),
+                        create_filters(diameter_max=10), create_filters(date=datetime.date(2020, 3, 2))):
+            with self.subTest(filters=filters):
+                self.assertEqual(columnar_db.count(filters), db.count(filters))
+                self.assertEqual(sorted(id(approach) for approach in columnar_db.query(filters)),
+                                 sorted(id(approach) for approach in db.query(filters)))
+        self.assertTrue(all(approach.neo for approach in columnar_db.query(create_filters(hazardous=False))))
+
+
+if __name__ == '__main__':
+    unittest.main()
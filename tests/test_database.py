@@ -10,13 +10,17 @@ To run these tests from the project root, run:
 
 These tests should pass when Task 2 is complete.
 """
+import collections
+import datetime
 import pathlib
 import math
 import unittest
 
 
 from extract import load_neos, load_approaches
-from database import NEODatabase
+from database import NEODatabase, _Bitmap
+from filters import create_filters
+from models import NearEarthObject, CloseApproach
 
 
 # Paths to the test data files.
@@ -36,6 +40,10 @@ class TestDatabase(unittest.TestCase):
         for approach in self.approaches:
             self.assertIsNotNone(approach.neo)
 
+    def test_database_construction_shares_designation_strings(self):
+        for approach in self.approaches:
+            self.assertIs(approach._designation, approach.neo.designation)
+
     def test_database_construction_ensures_each_neo_has_an_approaches_attribute(self):
         for neo in self.neos:
             self.assertTrue(hasattr(neo, 'approaches'))
@@ -114,6 +122,427 @@ class TestDatabase(unittest.TestCase):
         nonexistent = self.db.get_neo_by_name('not-real-name')
         self.assertIsNone(nonexistent)
 
+    def test_indexed_query_only_visits_matching_approaches(self):
+        date = datetime.date(2020, 3, 2)
+        filters = create_filters(date=date, distance_max=0.1)
+        plan = self.db._plan(filters)
+
+        expected = [row for row, approach in enumerate(self.approaches)
+                    if approach.time.date() == date]
+        distances = [row for row, approach in enumerate(self.approaches)
+                     if approach.distance <= 0.1]
+        self.assertEqual(len(plan.rows), min(len(expected), len(distances)))
+        self.assertEqual(len(plan.residual), 1)
+
+    def test_date_filters_resolve_to_calendar_ranges(self):
+        first = min(approach.time for approach in self.approaches).date()
+        last = max(approach.time for approach in self.approaches).date()
+        dates = [first - datetime.timedelta(days=3), first, datetime.date(2020, 3, 2),
+                 datetime.date(2020, 7, 4), last, last + datetime.timedelta(days=3)]
+        for date in dates:
+            for options in ({'date': date}, {'start_date': date}, {'end_date': date},
+                            {'start_date': date, 'end_date': date + datetime.timedelta(days=10)},
+                            {'start_date': date, 'end_date': date - datetime.timedelta(days=1)}):
+                with self.subTest(**options):
+                    filters = create_filters(**options)
+                    expected = sorted(row for row, approach in enumerate(self.approaches)
+                                      if all(approach_filter(approach) for approach_filter in filters))
+                    plan = self.db._plan(filters, driver='time')
+                    self.assertEqual(plan.residual, ())
+                    self.assertEqual(list(plan.rows), expected)
+
+    def test_plan_checks_most_selective_residual_filter_first(self):
+        filters = create_filters(distance_max=0.5, velocity_min=40, hazardous=False)
+        plan = self.db._plan(filters)
+        self.assertEqual(plan.selectivities, sorted(plan.selectivities))
+
+    def test_explain_reports_estimated_and_actual_rows(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), hazardous=True)
+        actual = sum(1 for _ in self.db.query(filters))
+        report = self.db.explain(filters)
+        self.assertIn("Index range scan on 'time'", report)
+        self.assertIn("Estimated matches:", report)
+        self.assertIn(f"Actual matches: {actual}", report)
+
+
+class TestApproachSummaries(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.db = NEODatabase(cls.neos, load_approaches(TEST_CAD_FILE))
+        cls.busiest = max(cls.neos, key=lambda neo: len(neo.approaches))
+
+    def test_approaches_are_sorted_by_time(self):
+        for neo in self.neos:
+            times = [approach.time for approach in neo.approaches]
+            self.assertEqual(times, sorted(times))
+
+    def test_summary_properties(self):
+        neo = self.busiest
+        self.assertGreater(len(neo.approaches), 1)
+        self.assertEqual(neo.first_approach.time, min(approach.time for approach in neo.approaches))
+        self.assertEqual(neo.last_approach.time, max(approach.time for approach in neo.approaches))
+        self.assertEqual(neo.closest_approach.distance, min(approach.distance for approach in neo.approaches))
+        self.assertEqual(neo.fastest_approach.velocity, max(approach.velocity for approach in neo.approaches))
+
+    def test_next_approach(self):
+        neo = self.busiest
+        for approach in neo.approaches:
+            self.assertIs(neo.next_approach(approach.time), approach)
+            self.assertIs(neo.next_approach(approach.time - datetime.timedelta(seconds=30)), approach)
+        self.assertIsNone(neo.next_approach(neo.last_approach.time + datetime.timedelta(seconds=1)))
+
+    def test_neo_without_approaches(self):
+        neo = NearEarthObject('test')
+        self.assertIsNone(neo.first_approach)
+        self.assertIsNone(neo.closest_approach)
+        self.assertIsNone(neo.next_approach(datetime.datetime(2020, 1, 1)))
+
+    def test_adding_an_approach_refreshes_the_summary(self):
+        neo = NearEarthObject('test', hazardous=False)
+        neo.add_approach(CloseApproach('test', '2020-Jan-02 00:00', 0.2, 10.0))
+        self.assertEqual(neo.closest_approach.distance, 0.2)
+        neo.add_approach(CloseApproach('test', '2020-Jan-01 00:00', 0.1, 20.0))
+        self.assertEqual(neo.closest_approach.distance, 0.1)
+        self.assertEqual(neo.first_approach.time, datetime.datetime(2020, 1, 1))
+
+
+class TestNameSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def names(self, neos):
+        return [neo.name for neo in neos]
+
+    def test_prefix_search_ignores_case(self):
+        self.assertEqual(self.names(self.db.search_neos(prefix='apoph')), ['Apophis'])
+        self.assertEqual(self.names(self.db.search_neos(prefix='TORO')), ['Toro'])
+
+    def test_prefix_search_is_alphabetical_and_limited(self):
+        named = sorted((neo.name for neo in self.db._neos.values() if neo.name), key=str.casefold)
+        self.assertEqual(self.names(self.db.search_neos(prefix='', limit=None)), named)
+        self.assertEqual(self.names(self.db.search_neos(prefix='', limit=3)), named[:3])
+
+    def test_fuzzy_search_finds_misspelled_names(self):
+        self.assertEqual(self.names(self.db.search_neos(fuzzy='Apofis'))[:1], ['Apophis'])
+        self.assertEqual(self.names(self.db.search_neos(fuzzy='adonnis'))[:1], ['Adonis'])
+        self.assertEqual(self.db.search_neos(fuzzy='qqqqqq'), [])
+
+    def test_prefix_matches_come_before_fuzzy_matches_once(self):
+        neos = self.db.search_neos(prefix='toro', fuzzy='toro')
+        self.assertEqual(self.names(neos).count('Toro'), 1)
+        self.assertEqual(neos[0].name, 'Toro')
+
+    def test_search_requires_a_term(self):
+        with self.assertRaises(ValueError):
+            self.db.search_neos()
+
+
+class TestBitmapIndexes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def expected(self, filters):
+        return [row for row, approach in enumerate(self.approaches)
+                if all(approach_filter(approach) for approach_filter in filters)]
+
+    def test_bitmap_operations(self):
+        first = _Bitmap(20, [0, 3, 8, 19])
+        second = _Bitmap(20, [3, 4, 19])
+        self.assertEqual(list(first & second), [3, 19])
+        self.assertEqual(list(first | second), [0, 3, 4, 8, 19])
+        self.assertEqual(len(first), 4)
+        self.assertTrue(8 in first)
+        self.assertFalse(8 in second)
+        self.assertEqual(list(_Bitmap(20)), [])
+
+    def test_hazardous_only_query_is_a_bitmap_scan(self):
+        for hazardous in (True, False):
+            with self.subTest(hazardous=hazardous):
+                filters = create_filters(hazardous=hazardous)
+                plan = self.db._plan(filters)
+                self.assertIsNone(plan.driver)
+                self.assertEqual(plan.residual, ())
+                self.assertEqual(list(plan.rows), self.expected(filters))
+                self.assertEqual(self.db.count(filters), len(self.expected(filters)))
+
+    def test_bitmap_is_intersected_with_index_range(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), hazardous=False)
+        plan = self.db._plan(filters)
+        self.assertEqual(plan.driver, 'time')
+        self.assertEqual(plan.residual, ())
+        self.assertEqual(plan.rows, self.expected(filters))
+        self.assertEqual(self.db.count(filters), len(self.expected(filters)))
+
+    def test_unknown_diameters_are_skipped_by_bitmap(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1), end_date=datetime.date(2020, 6, 7),
+                                 diameter_max=1.0)
+        plan = self.db._plan(filters)
+        self.assertEqual(plan.known, ('diameter',))
+        self.assertTrue(all(self.approaches[row].neo.diameter <= 1.0 for row in plan.rows))
+        self.assertEqual(sorted(self.approaches.index(approach) for approach in self.db.query(filters)),
+                         self.expected(filters))
+
+    def test_ordered_and_aggregate_queries_respect_bitmap(self):
+        filters = create_filters(hazardous=True, distance_max=0.2)
+        matches = [self.approaches[row] for row in self.expected(filters)]
+        self.assertEqual([approach.distance for approach in self.db.query(filters, order_by='distance')],
+                         sorted(approach.distance for approach in matches))
+        self.assertEqual(self.db.max('velocity', filters), max(approach.velocity for approach in matches))
+        self.assertEqual(self.db.histogram(create_filters(hazardous=True), by='month'),
+                         sorted(collections.Counter(approach.time.strftime('%Y-%m') for approach in self.approaches
+                                                    if approach.neo.hazardous).items()))
+
+    def test_explain_reports_bitmap_scan(self):
+        report = self.db.explain(create_filters(hazardous=True))
+        self.assertIn("Bitmap scan", report)
+        self.assertIn("Bitmap HazardFilter", report)
+
+
+class TestAggregations(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+        cls.filter_sets = (
+            create_filters(),
+            create_filters(start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 5, 31)),
+            create_filters(distance_max=0.1, velocity_min=10),
+            create_filters(hazardous=True, diameter_min=0.5),
+            create_filters(date=datetime.date(2020, 1, 1), distance_min=10),
+        )
+
+    def values(self, field, filters):
+        get = {'time': lambda approach: approach.time,
+               'distance': lambda approach: approach.distance,
+               'velocity': lambda approach: approach.velocity,
+               'diameter': lambda approach: approach.neo.diameter}[field]
+        values = [get(approach) for approach in self.db.query(filters)]
+        return [value for value in values if value == value]
+
+    def test_count(self):
+        for filters in self.filter_sets:
+            self.assertEqual(self.db.count(filters), sum(1 for _ in self.db.query(filters)))
+
+    def test_min_and_max(self):
+        for filters in self.filter_sets:
+            for field in ('time', 'distance', 'velocity', 'diameter'):
+                values = self.values(field, filters)
+                self.assertEqual(self.db.min(field, filters), min(values, default=None))
+                self.assertEqual(self.db.max(field, filters), max(values, default=None))
+
+    def test_mean_skips_unknown_values(self):
+        for filters in self.filter_sets:
+            for field in ('distance', 'velocity', 'diameter'):
+                values = self.values(field, filters)
+                if values:
+                    self.assertAlmostEqual(self.db.mean(field, filters), sum(values) / len(values))
+                else:
+                    self.assertIsNone(self.db.mean(field, filters))
+
+    def test_histogram(self):
+        for filters in self.filter_sets:
+            for by, width in (('year', 4), ('month', 7)):
+                expected = collections.Counter(time.strftime('%Y-%m')[:width]
+                                               for time in self.values('time', filters))
+                self.assertEqual(self.db.histogram(filters, by=by), sorted(expected.items()))
+
+    def test_histogram_by_month_of_a_date_range(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 15), end_date=datetime.date(2020, 4, 15))
+        months = self.db.histogram(filters, by='month')
+        self.assertEqual([label for label, _ in months], ['2020-03', '2020-04'])
+        self.assertEqual(sum(count for _, count in months), self.db.count(filters))
+
+    def test_unsupported_aggregations_raise(self):
+        with self.assertRaises(ValueError):
+            self.db.histogram(by='week')
+        with self.assertRaises(ValueError):
+            self.db.mean('time')
+        with self.assertRaises(ValueError):
+            self.db.min('hazardous')
+
+
+class TestOrderedQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.filter_sets = (
+            create_filters(),
+            create_filters(date=datetime.date(2020, 3, 2)),
+            create_filters(distance_max=0.1, velocity_min=10),
+            create_filters(start_date=datetime.date(2020, 6, 1), diameter_max=1.0),
+            create_filters(velocity_min=25, hazardous=False),
+        )
+
+    def sort_keys(self, approaches, field):
+        get = {'time': lambda approach: approach.time,
+               'distance': lambda approach: approach.distance,
+               'velocity': lambda approach: approach.velocity,
+               'diameter': lambda approach: approach.neo.diameter}[field]
+        return [(get(approach) != get(approach), get(approach) if get(approach) == get(approach) else 0)
+                for approach in approaches]
+
+    def test_ordered_query_matches_sorting_every_match(self):
+        for filters in self.filter_sets:
+            for field in ('time', 'distance', 'velocity', 'diameter'):
+                for descending in (False, True):
+                    for limit in (None, 1, 20):
+                        matches = self.sort_keys(self.db.query(filters), field)
+                        expected = (sorted((key for key in matches if not key[0]), reverse=descending)
+                                    + [key for key in matches if key[0]])
+                        received = self.sort_keys(
+                            self.db.query(filters, order_by=field, descending=descending, limit=limit), field)
+                        self.assertEqual(received, expected[:limit])
+
+    def test_ordered_query_returns_the_same_approaches(self):
+        filters = create_filters(distance_max=0.1, velocity_min=10)
+        ordered = self.db.query(filters, order_by='diameter', descending=True)
+        self.assertEqual(set(ordered), set(self.db.query(filters)))
+
+    def test_unknown_diameters_come_last(self):
+        diameters = [approach.neo.diameter for approach in self.db.query(order_by='diameter', descending=True)]
+        known = [diameter for diameter in diameters if not math.isnan(diameter)]
+        self.assertEqual(diameters[:len(known)], known)
+        self.assertTrue(all(math.isnan(diameter) for diameter in diameters[len(known):]))
+
+    def test_limit_without_order(self):
+        filters = create_filters(hazardous=True)
+        self.assertEqual(list(self.db.query(filters, limit=3)), list(self.db.query(filters))[:3])
+
+    def test_limited_query_stops_scanning(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        visited = []
+
+        class VisitedList(list):
+            def __getitem__(self, row):
+                visited.append(row)
+                return super().__getitem__(row)
+
+        db._approaches = VisitedList(db._approaches)
+        filters = create_filters(velocity_min=5)
+        self.assertEqual(len(list(db.query(filters, limit=3))), 3)
+        self.assertLess(len(visited), 20)
+
+    def test_unsupported_sort_field_raises(self):
+        with self.assertRaises(ValueError):
+            self.db.query(order_by='hazardous')
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE), cache_rows=1000)
+        self.filters = create_filters(start_date=datetime.date(2020, 12, 1), distance_max=0.1)
+
+    def test_filters_compare_and_hash_by_value(self):
+        self.assertEqual(create_filters(distance_max=0.1), create_filters(distance_max=0.1))
+        self.assertEqual(hash(create_filters(hazardous=True)), hash(create_filters(hazardous=True)))
+        self.assertNotEqual(create_filters(distance_max=0.1), create_filters(distance_min=0.1))
+
+    def test_repeated_query_hits_cache(self):
+        expected = list(self.db.query(self.filters))
+        self.assertEqual(self.db.cache_info().misses, 1)
+        self.assertEqual(list(self.db.query(self.filters)), expected)
+        self.assertEqual(list(self.db.query(tuple(reversed(self.filters)))), expected)
+        info = self.db.cache_info()
+        self.assertEqual(info.hits, 2)
+        self.assertEqual(info.rows, len(expected))
+
+    def test_partially_consumed_query_is_not_cached(self):
+        next(self.db.query(self.filters))
+        self.assertEqual(self.db.cache_info().rows, 0)
+
+    def test_cache_evicts_least_recently_used_results(self):
+        december = list(self.db.query(self.filters))
+        april = create_filters(date=datetime.date(2020, 4, 1))
+        list(self.db.query(april))
+        list(self.db.query(create_filters()))  # Larger than the whole cache.
+        self.assertEqual(self.db.cache_info().rows, len(december) + 14)
+
+        list(self.db.query(create_filters(distance_max=0.05)))  # Needs almost the whole cache.
+        self.assertLessEqual(self.db.cache_info().rows, 1000)
+        misses = self.db.cache_info().misses
+        self.assertEqual(list(self.db.query(self.filters)), december)
+        self.assertEqual(self.db.cache_info().misses, misses + 1)
+
+
+def _approach_key(approach):
+    return approach._designation, approach.time, approach.distance, approach.velocity
+
+
+class TestIncrementalUpdates(unittest.TestCase):
+    filter_sets = (
+        create_filters(),
+        create_filters(date=datetime.date(2020, 3, 2)),
+        create_filters(start_date=datetime.date(2020, 6, 1), distance_max=0.1),
+        create_filters(hazardous=True),
+        create_filters(diameter_min=0.5, velocity_max=20),
+    )
+
+    def setUp(self):
+        self.neos = load_neos(TEST_NEO_FILE)
+        self.approaches = load_approaches(TEST_CAD_FILE)
+        self.full = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def assertSameAs(self, db, full):
+        for filters in self.filter_sets:
+            with self.subTest(filters=filters):
+                self.assertEqual(sorted(map(_approach_key, db.query(filters))),
+                                 sorted(map(_approach_key, full.query(filters))))
+                self.assertEqual(db.count(filters), full.count(filters))
+                self.assertEqual(db.histogram(filters, by='month'), full.histogram(filters, by='month'))
+                self.assertEqual([_approach_key(approach) for approach in db.query(filters, order_by='distance')],
+                                 [_approach_key(approach) for approach in full.query(filters, order_by='distance')])
+
+    def test_add_approaches(self):
+        half = len(self.approaches) // 2
+        db = NEODatabase(self.neos, self.approaches[half:])
+        list(db.query(create_filters(hazardous=True)))
+        db.add_approaches(self.approaches[:half])
+        self.assertSameAs(db, self.full)
+        for neo in self.neos:
+            # The earlier approaches, added later, still come first.
+            self.assertEqual([_approach_key(approach) for approach in neo.approaches],
+                             [_approach_key(approach)
+                              for approach in self.full.get_neo_by_designation(neo.designation).approaches])
+
+    def test_add_neos_links_earlier_approaches(self):
+        hazardous = [neo for neo in self.neos if neo.hazardous]
+        db = NEODatabase([neo for neo in self.neos if not neo.hazardous], self.approaches)
+        self.assertEqual(db.count(create_filters(hazardous=True)), 0)
+        db.add_neos(hazardous)
+        self.assertSameAs(db, self.full)
+        self.assertIs(db.get_neo_by_designation(hazardous[0].designation), hazardous[0])
+        self.assertTrue(all(approach.neo is not None for approach in self.approaches))
+
+    def test_add_neos_replaces_neos_with_the_same_designation(self):
+        db = NEODatabase(self.neos, self.approaches)
+        old = db.get_neo_by_name('Adonis')
+        new = NearEarthObject(old.designation, old.name, diameter=123.5, hazardous=False)
+        count = len(old.approaches)
+        db.add_neos([new])
+        self.assertIs(db.get_neo_by_name('adonis'), new)
+        self.assertEqual(db.search_neos(prefix='adonis'), [new])
+        self.assertIs(db.search_neos(fuzzy='adonnis')[0], new)
+        self.assertEqual(len(new.approaches), count)
+        self.assertEqual(old.approaches, [])
+        self.assertEqual(db.count(create_filters(diameter_min=123, diameter_max=124)), count)
+        self.assertFalse(any(approach.neo is new for approach in db.query(create_filters(hazardous=True))))
+
+    def test_remove_neos(self):
+        db = NEODatabase(self.neos, self.approaches)
+        removed = db.remove_neos(['2101', '1865'])
+        self.assertEqual({neo.name for neo in removed}, {'Adonis', 'Cerberus'})
+        self.assertIsNone(db.get_neo_by_designation('2101'))
+        self.assertEqual(db.search_neos(prefix='adon'), [])
+
+        full = NEODatabase([neo for neo in load_neos(TEST_NEO_FILE) if neo.designation not in ('2101', '1865')],
+                           [approach for approach in load_approaches(TEST_CAD_FILE)
+                            if approach._designation not in ('2101', '1865')])
+        self.assertSameAs(db, full)
+
 
 if __name__ == '__main__':
     unittest.main()
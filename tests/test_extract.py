@@ -11,12 +11,18 @@ To run these tests from the project root, run:
 These tests should pass when Task 2 is complete.
 """
 import collections.abc
+import csv
 import datetime
+import io
+import json
 import pathlib
 import math
+import tempfile
 import unittest
+from unittest import mock
 
-from extract import load_neos, load_approaches
+import extract
+from extract import load_neos, load_approaches, _iter_cad_data, _load_approaches_parallel
 from models import NearEarthObject, CloseApproach
 
 
@@ -77,6 +83,36 @@ class TestLoadNEOs(unittest.TestCase):
         self.assertEqual(neo.diameter, 0.6)
         self.assertEqual(neo.hazardous, True)
 
+    def test_neos_match_every_csv_row(self):
+        with open(TEST_NEO_FILE) as neo_file:
+            rows = list(csv.DictReader(neo_file))
+        self.assertEqual([(neo.designation, neo.name or '', neo.hazardous) for neo in self.neos],
+                         [(row['pdes'], row['name'], row['pha'] == 'Y') for row in rows])
+
+    def test_extra_columns_are_loaded_on_demand(self):
+        self.assertIsNone(self.neos_by_designation['2101'].extras)
+        neos = {neo.designation: neo for neo in load_neos(TEST_NEO_FILE, extra_columns=('H', 'albedo', 'class'))}
+        toro = neos['1685']
+        self.assertEqual(toro.extras, {'H': 14.3, 'albedo': 0.31, 'class': 'APO'})
+        self.assertIsNone(neos['2019 SC8'].extras['albedo'])
+
+    def test_quoted_fields_are_parsed_as_csv(self):
+        text = ('pdes,name,diameter,pha,moid\n'
+                '433,Eros,16.84,N,.148\n'
+                '"2020 AB","Name, with comma",,Y,0.01\n'
+                '"2020 CD","Two\nlines",1.5,N,\n')
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'neos.csv'
+            path.write_text(text)
+            neos = load_neos(path, extra_columns=('moid',))
+        self.assertEqual([(neo.designation, neo.name, neo.hazardous, neo.extras['moid']) for neo in neos],
+                         [('433', 'Eros', False, 0.148), ('2020 AB', 'Name, with comma', True, 0.01),
+                          ('2020 CD', 'Two\nlines', False, None)])
+
+    def test_missing_columns_raise(self):
+        with self.assertRaises(ValueError):
+            load_neos(TEST_NEO_FILE, extra_columns=('not-a-column',))
+
 
 class TestLoadApproaches(unittest.TestCase):
     @classmethod
@@ -117,6 +153,150 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsNotNone(approach)
         self.assertIsInstance(approach.velocity, float)
 
+    def test_approach_has_no_instance_dict(self):
+        approach = self.get_first_approach_or_none()
+        self.assertIsNotNone(approach)
+        self.assertFalse(hasattr(approach, '__dict__'))
+
+    def test_compact_time_approaches_have_same_times(self):
+        compact = load_approaches(TEST_CAD_FILE, compact_time=True)
+        self.assertEqual(len(compact), len(self.approaches))
+        for approach, compact_approach in zip(self.approaches, compact):
+            self.assertIsInstance(compact_approach.time, datetime.datetime)
+            self.assertEqual(approach.time, compact_approach.time)
+
+
+class TestStreamCadData(unittest.TestCase):
+    def test_stream_matches_json_load_with_tiny_chunks(self):
+        text = TEST_CAD_FILE.read_text()
+        header = {}
+        entries = list(_iter_cad_data(io.StringIO(text), header, chunk_size=7))
+        document = json.loads(text)
+        self.assertEqual(entries, document['data'])
+        self.assertEqual(header['count'], document['count'])
+
+    def test_stream_reads_members_around_data(self):
+        text = '{"signature": {"version": "1.1"}, "count": 12345, "data": [["a", 1.5e3], []], "fields": ["des"]}'
+        header = {}
+        entries = list(_iter_cad_data(io.StringIO(text), header, chunk_size=3))
+        self.assertEqual(entries, [["a", 1500.0], []])
+        self.assertEqual(header, {"signature": {"version": "1.1"}, "count": 12345, "fields": ["des"]})
+
+    def test_stream_handles_empty_data(self):
+        self.assertEqual(list(_iter_cad_data(io.StringIO('{"count": 0, "data": [ ]}'))), [])
+        self.assertEqual(list(_iter_cad_data(io.StringIO('{}'))), [])
+
+    def test_stream_rejects_malformed_documents(self):
+        for text in ('[]', '{"data": [["a"] ["b"]]}', '{"data": [["a"],', ''):
+            with self.assertRaises(json.JSONDecodeError):
+                list(_iter_cad_data(io.StringIO(text), chunk_size=4))
+
+
+class TestSchemaDrivenApproaches(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.document = json.loads(TEST_CAD_FILE.read_text())
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def write_document(self, directory, document):
+        path = pathlib.Path(directory) / 'cad.json'
+        path.write_text(json.dumps(document))
+        return path
+
+    def test_extra_fields_are_collected_into_arrays(self):
+        extras = dict.fromkeys(('dist_min', 'v_inf', 'h'))
+        load_approaches(TEST_CAD_FILE, extras=extras)
+        fields = self.document['fields']
+        for name, column in extras.items():
+            self.assertEqual(column.typecode, 'd')
+            expected = [entry[fields.index(name)] for entry in self.document['data']]
+            self.assertEqual([None if math.isnan(value) else value for value in column],
+                             [None if value is None else float(value) for value in expected])
+
+    def test_fields_are_resolved_by_name(self):
+        fields = list(reversed(self.document['fields']))
+        data = [list(reversed(entry)) for entry in self.document['data'][:20]]
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_document(directory, {'fields': fields, 'count': 20, 'data': data})
+            approaches = load_approaches(path)
+        self.assertEqual([(approach._designation, approach.time, approach.distance, approach.velocity)
+                          for approach in approaches],
+                         [(approach._designation, approach.time, approach.distance, approach.velocity)
+                          for approach in self.approaches[:20]])
+
+    def test_missing_values_of_extra_fields_are_nan(self):
+        data = [entry[:8] + [None] + entry[9:] for entry in self.document['data'][:3]]
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_document(directory, {'fields': self.document['fields'], 'data': data})
+            extras = {'v_inf': None}
+            load_approaches(path, extras=extras)
+        self.assertTrue(all(math.isnan(value) for value in extras['v_inf']))
+
+    def test_count_mismatch_raises(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_document(directory, {'count': '5', 'data': self.document['data'][:4]})
+            with self.assertRaises(ValueError):
+                load_approaches(path)
+
+    def test_missing_fields_raise(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_document(directory, {'fields': ['des', 'cd'], 'data': []})
+            with self.assertRaises(ValueError):
+                load_approaches(path)
+
+
+class TestParallelLoadApproaches(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def assertSameApproaches(self, received, expected):
+        self.assertEqual([(approach._designation, approach.time, approach.distance, approach.velocity)
+                          for approach in received],
+                         [(approach._designation, approach.time, approach.distance, approach.velocity)
+                          for approach in expected])
+
+    def test_chunks_are_stitched_in_order(self):
+        for jobs in (2, 5):
+            received = _load_approaches_parallel(TEST_CAD_FILE, False, jobs, min_chunk_bytes=1024)
+            self.assertSameApproaches(received, self.approaches)
+
+    def test_chunks_before_other_members(self):
+        document = json.loads(TEST_CAD_FILE.read_text())
+        text = json.dumps({'count': 50, 'data': document['data'][:50],
+                           'fields': document['fields']}, indent=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'cad.json'
+            path.write_text(text)
+            received = _load_approaches_parallel(path, True, 3, min_chunk_bytes=256)
+        self.assertSameApproaches(received, self.approaches[:50])
+
+    def test_extra_fields_match_serial_loading(self):
+        expected = dict.fromkeys(('dist_max', 'h'))
+        load_approaches(TEST_CAD_FILE, extras=expected)
+        received = dict.fromkeys(('dist_max', 'h'))
+        _load_approaches_parallel(TEST_CAD_FILE, False, 3, min_chunk_bytes=1024, extras=received)
+        self.assertEqual({name: column.tobytes() for name, column in received.items()},
+                         {name: column.tobytes() for name, column in expected.items()})
+
+    def test_small_files_are_read_serially(self):
+        self.assertIsNone(_load_approaches_parallel(TEST_CAD_FILE, False, 16))
+        self.assertSameApproaches(load_approaches(TEST_CAD_FILE, jobs=16), self.approaches)
+
+    def test_jobs_are_limited_to_available_cpus(self):
+        with mock.patch.object(extract, 'available_cpus', return_value=1), \
+                mock.patch.object(extract, '_load_approaches_parallel') as parallel:
+            self.assertSameApproaches(load_approaches(TEST_CAD_FILE, jobs=8), self.approaches)
+        parallel.assert_not_called()
+
+    def test_pool_that_cannot_start_falls_back_to_serial_reading(self):
+        error = RuntimeError("An attempt has been made to start a new process before the current process "
+                             "has finished its bootstrapping phase.")
+        with mock.patch.object(extract, 'available_cpus', return_value=4), \
+                mock.patch.object(extract, '_load_approaches_parallel', side_effect=error) as parallel:
+            self.assertSameApproaches(load_approaches(TEST_CAD_FILE, jobs=4), self.approaches)
+        parallel.assert_called_once()
+
 
 if __name__ == '__main__':
     unittest.main()
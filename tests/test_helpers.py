@@ -0,0 +1,59 @@
+"""Check that datetimes are converted to and from strings and minute counts.
+
+The `cd_to_datetime` function parses NASA's calendar date format by hand, so it
+must agree with `datetime.strptime`, including on the errors it raises.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import datetime
+import unittest
+
+from helpers import cd_to_datetime, datetime_to_str, datetime_to_minutes, minutes_to_datetime
+
+
+CD_FORMAT = "%Y-%b-%d %H:%M"
+
+
+class TestCdToDatetime(unittest.TestCase):
+    def test_parses_calendar_dates(self):
+        self.assertEqual(cd_to_datetime('2020-Dec-31 12:00'), datetime.datetime(2020, 12, 31, 12, 0))
+        self.assertEqual(cd_to_datetime('1900-Jan-01 00:00'), datetime.datetime(1900, 1, 1, 0, 0))
+        self.assertEqual(cd_to_datetime('2020-Feb-29 23:59'), datetime.datetime(2020, 2, 29, 23, 59))
+
+    def test_agrees_with_strptime_on_looser_layouts(self):
+        for calendar_date in ('2020-jan-01 00:54', '2020-Jan-1 0:54', '2020-JAN-01 00:54'):
+            self.assertEqual(cd_to_datetime(calendar_date),
+                             datetime.datetime.strptime(calendar_date, CD_FORMAT))
+
+    def test_raises_strptime_errors_on_malformed_input(self):
+        for calendar_date in ('2020-Feb-30 00:00', '2020-Foo-01 00:00', '2020-Jan-01 24:00',
+                              '2020-01-01 00:00', '', '2020-Jan-01 00:00 '):
+            with self.assertRaises(ValueError) as expected:
+                datetime.datetime.strptime(calendar_date, CD_FORMAT)
+            with self.assertRaises(ValueError) as received:
+                cd_to_datetime(calendar_date)
+            self.assertEqual(str(received.exception), str(expected.exception))
+
+    def test_raises_type_error_on_non_strings(self):
+        with self.assertRaises(TypeError):
+            cd_to_datetime(None)
+
+
+class TestMinutes(unittest.TestCase):
+    def test_round_trip(self):
+        for dt in (datetime.datetime(1970, 1, 1), datetime.datetime(1900, 1, 1, 0, 1),
+                   datetime.datetime(2200, 12, 31, 23, 59)):
+            self.assertEqual(minutes_to_datetime(datetime_to_minutes(dt)), dt)
+
+    def test_truncates_seconds(self):
+        self.assertEqual(datetime_to_minutes(datetime.datetime(1970, 1, 1, 0, 1, 59)), 1)
+        self.assertEqual(datetime_to_minutes(datetime.datetime(1969, 12, 31, 23, 59, 30)), -1)
+
+    def test_datetime_to_str_omits_seconds(self):
+        self.assertEqual(datetime_to_str(datetime.datetime(2020, 12, 31, 12, 0, 30)), '2020-12-31 12:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
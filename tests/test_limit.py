@@ -10,6 +10,7 @@ implement it imperatively with the tools from the `itertools` module.
 These tests should pass when Task 3c is complete.
 """
 import collections.abc
+import itertools
 import unittest
 
 from filters import limit
@@ -49,6 +50,18 @@ class TestLimit(unittest.TestCase):
         self.assertIsInstance(limit(self.iterable, 0), collections.abc.Iterable)
         self.assertIsInstance(limit(self.iterable, None), collections.abc.Iterable)
 
+    def test_limit_is_lazy(self):
+        drawn = []
+        values = limit(map(drawn.append, itertools.count()), 3)
+        self.assertEqual(drawn, [])
+        next(values)
+        self.assertEqual(len(drawn), 1)
+        self.assertEqual(len(list(values)), 2)
+        self.assertEqual(len(drawn), 3)
+
+    def test_limit_stops_an_infinite_iterator(self):
+        self.assertEqual(tuple(limit(itertools.count(), 3)), (0, 1, 2))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,129 @@
+"""Check that the interactive shell hot-reloads its data files in the background.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_main
+"""
+import contextlib
+import io
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import unittest
+
+from main import NEOShell, make_parser
+
+
+class FakeDatabase:
+    """A stand-in for an `NEODatabase` that records whether it was closed."""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestShellReload(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.neofile = self.tmpdir / 'neos.csv'
+        self.cadfile = self.tmpdir / 'cad.json'
+        self.neofile.write_text('pdes\n')
+        self.cadfile.write_text('{}')
+
+        self.reloads = 0
+        self.failure = None
+        self.release = threading.Event()
+        self.release.set()
+
+        def reload():
+            self.reloads += 1
+            self.release.wait()
+            if self.failure is not None:
+                raise self.failure
+            return FakeDatabase(self.reloads)
+
+        _, inspect_parser, query_parser, stats_parser, update_parser = make_parser()
+        self.db = FakeDatabase(0)
+        self.shell = NEOShell(self.db, inspect_parser, query_parser, stats_parser,
+                              update_parser=update_parser, reload=reload,
+                              sources=(self.neofile, self.cadfile))
+
+    def precmd(self):
+        """Run the shell's pre-command hook, hiding its messages."""
+        with contextlib.redirect_stderr(io.StringIO()):
+            return self.shell.precmd('stats')
+
+    def change(self, path):
+        """Change a data file's contents, size and modification time."""
+        path.write_text(path.read_text() + ' ')
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def wait(self):
+        """Wait for the reload in progress, if any, to finish."""
+        if self.shell._reloading is not None:
+            self.shell._reloading.join()
+
+    def test_unchanged_files_are_not_reloaded(self):
+        self.assertEqual(self.precmd(), 'stats')
+        self.precmd()
+        self.assertIsNone(self.shell._reloading)
+        self.assertEqual(self.reloads, 0)
+
+    def test_change_starts_exactly_one_reload(self):
+        self.release.clear()
+        self.change(self.cadfile)
+        self.precmd()
+        self.precmd()
+        self.precmd()
+        self.release.set()
+        self.wait()
+        self.assertEqual(self.reloads, 1)
+        self.assertIs(self.shell.db, self.db)
+
+    def test_reloaded_database_is_swapped_in_on_next_command(self):
+        self.change(self.neofile)
+        self.precmd()
+        self.wait()
+        self.assertIs(self.shell.db, self.db)
+        self.assertEqual(self.precmd(), 'stats')
+        self.assertEqual(self.shell.db.generation, 1)
+        self.assertTrue(self.db.closed)
+        self.assertFalse(self.shell.db.closed)
+
+    def test_failed_reload_keeps_old_database(self):
+        self.failure = ValueError("malformed data file")
+        self.change(self.cadfile)
+        self.precmd()
+        self.wait()
+        self.precmd()
+        self.assertIs(self.shell.db, self.db)
+        self.assertFalse(self.db.closed)
+        self.assertEqual(self.reloads, 1)
+
+    def test_change_during_reload_triggers_another_reload(self):
+        self.release.clear()
+        self.change(self.cadfile)
+        self.precmd()
+        self.change(self.cadfile)
+        self.precmd()
+        self.release.set()
+        self.wait()
+        self.precmd()  # Swaps in the first reload, and starts the second.
+        self.assertEqual(self.shell.db.generation, 1)
+        self.wait()
+        self.precmd()
+        self.assertEqual(self.reloads, 2)
+        self.assertEqual(self.shell.db.generation, 2)
+        self.precmd()
+        self.assertEqual(self.reloads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
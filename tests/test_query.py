@@ -18,7 +18,7 @@ import unittest
 
 from database import NEODatabase
 from extract import load_neos, load_approaches
-from filters import create_filters
+from filters import create_filters, compile_filters
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -566,5 +566,38 @@ class TestQuery(unittest.TestCase):
                          msg="Computed results do not match expected results.")
 
 
+class TestCompileFilters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(cls.neos, cls.approaches)
+
+    def assertMatchesFilters(self, filters):
+        predicate = compile_filters(filters)
+        for approach in self.approaches:
+            self.assertEqual(predicate(approach), all(f(approach) for f in filters),
+                             msg=f"Compiled predicate disagrees with {filters} on {approach!r}.")
+
+    def test_compiled_empty_filters_match_everything(self):
+        self.assertMatchesFilters(create_filters())
+
+    def test_compiled_date_bounds_match_filters(self):
+        self.assertMatchesFilters(create_filters(date=datetime.date(2020, 3, 2)))
+        self.assertMatchesFilters(create_filters(start_date=datetime.date(2020, 3, 1),
+                                                 end_date=datetime.date(2020, 3, 31)))
+
+    def test_compiled_conflicting_bounds_match_nothing(self):
+        filters = create_filters(distance_min=0.5, distance_max=0.1)
+        self.assertMatchesFilters(filters)
+
+    def test_compiled_combined_filters_match_filters(self):
+        self.assertMatchesFilters(create_filters(
+            start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 5, 31),
+            distance_min=0.05, distance_max=0.5, velocity_min=5, velocity_max=25,
+            diameter_min=0.5, diameter_max=1.5, hazardous=False
+        ))
+
+
 if __name__ == '__main__':
     unittest.main()
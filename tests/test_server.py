@@ -0,0 +1,115 @@
+"""Check that a `RemoteDatabase` answers like the `NEODatabase` it is served from.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_server
+"""
+import datetime
+import pathlib
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+import server
+from server import RemoteDatabase, make_server, encode_filter, decode_filter
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.server = make_server(cls.db, port=0)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.remote = RemoteDatabase(f"http://127.0.0.1:{cls.server.server_address[1]}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        cls.db.close()
+
+    def test_filters_round_trip_through_their_encoding(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), distance_min=0.1,
+                                 velocity_max=20.0, diameter_min=0.5, hazardous=False)
+        for approach_filter in filters:
+            decoded = decode_filter(encode_filter(approach_filter))
+            self.assertEqual(repr(decoded), repr(approach_filter))
+
+    def test_malformed_hazard_filter_is_rejected(self):
+        for value in ('true', '1', 'yes', ''):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    decode_filter(f'HazardFilter:eq:{value}')
+                with self.assertRaises(urllib.error.HTTPError) as context:
+                    urllib.request.urlopen(f"{self.remote.url}/query?filter=HazardFilter:eq:{value}")
+                self.assertEqual(context.exception.code, 400)
+                context.exception.close()
+
+    def test_remote_query_matches_local_query(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 3, 31),
+                                 distance_max=0.2, hazardous=False)
+        expected = [str(approach) for approach in self.db.query(filters)]
+        received = [str(approach) for approach in self.remote.query(filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(expected, received)
+
+    def test_remote_query_can_stop_early(self):
+        results = self.remote.query(create_filters())
+        self.assertEqual(str(next(results)), str(next(self.db.query(create_filters()))))
+        results.close()
+
+    def test_remote_query_passes_order_and_limit(self):
+        filters = create_filters(hazardous=True)
+        expected = [str(approach) for approach in
+                    self.db.query(filters, order_by='velocity', descending=True, limit=5)]
+        received = [str(approach) for approach in
+                    self.remote.query(filters, order_by='velocity', descending=True, limit=5)]
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(expected, received)
+
+    def test_remote_inspect_by_designation_and_name(self):
+        neo = self.remote.get_neo_by_designation('2101')
+        self.assertEqual(neo.name, 'Adonis')
+        self.assertEqual(len(neo.approaches), len(self.db.get_neo_by_designation('2101').approaches))
+        self.assertEqual(self.remote.get_neo_by_name('Cerberus').designation, '1865')
+
+    def test_remote_search(self):
+        self.assertEqual([neo.designation for neo in self.remote.search_neos(prefix='apo', fuzzy='apo')],
+                         [neo.designation for neo in self.db.search_neos(prefix='apo', fuzzy='apo')])
+
+    def test_remote_search_is_limited(self):
+        self.assertEqual(len(self.remote.search_neos(prefix='', limit=None)), server._SEARCH_LIMIT)
+        with mock.patch.object(server, '_MAX_SEARCH_LIMIT', 3):
+            self.assertEqual(len(self.remote.search_neos(prefix='', limit=50)), 3)
+
+    def test_remote_inspect_missing(self):
+        self.assertIsNone(self.remote.get_neo_by_designation('not-real-designation'))
+        self.assertIsNone(self.remote.get_neo_by_name('not-real-name'))
+
+    def test_remote_explain(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2))
+        self.assertEqual(self.remote.explain(filters), self.db.explain(filters))
+
+    def test_remote_query_workers_are_capped(self):
+        filters = create_filters(velocity_min=5, hazardous=False)
+        expected = sorted(str(approach) for approach in self.db.query(filters))
+        with mock.patch.object(server, '_MAX_WORKERS', 2):
+            received = sorted(str(approach) for approach in self.remote.query(filters, workers=64))
+        self.assertEqual(received, expected)
+        self.assertEqual(self.db._shards.workers, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
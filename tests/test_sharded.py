@@ -0,0 +1,79 @@
+"""Check that sharded queries find the same approaches as `query`, in time order.
+
+These tests are skipped if `multiprocessing.shared_memory` isn't available.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sharded
+"""
+import datetime
+import operator
+import pathlib
+import threading
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, VelocityFilter
+from sharded import shared_memory
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+@unittest.skipIf(shared_memory is None, "multiprocessing.shared_memory is not available.")
+class TestShardedQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+
+    def assertSameResults(self, filters):
+        expected = sorted(self.db.query(filters), key=lambda approach: approach.time)
+        received = list(self.db.query(filters, workers=3))
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([approach.time for approach in received], [approach.time for approach in expected])
+        self.assertEqual(set(received), set(expected))
+
+    def test_broad_query(self):
+        self.assertSameResults(create_filters(velocity_min=5, hazardous=False))
+
+    def test_query_with_date_range_and_neo_filters(self):
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 2, 1), distance_min=0.01,
+                                              velocity_max=30, diameter_max=2.0))
+
+    def test_filters_without_an_interval_are_checked_in_the_main_process(self):
+        self.assertSameResults(create_filters(distance_min=0.01)
+                               + (VelocityFilter(operator.ne, self.db._approaches[0].velocity),))
+
+    def test_limited_query_stops_early(self):
+        filters = create_filters(velocity_min=5, hazardous=False)
+        expected = sorted(self.db.query(filters), key=lambda approach: approach.time)[:5]
+        self.assertEqual(list(self.db.query(filters, limit=5, workers=3)), expected)
+
+    def test_concurrent_queries_with_different_workers(self):
+        filters = create_filters(velocity_min=5, hazardous=False)
+        expected = sorted(self.db.query(filters), key=lambda approach: approach.time)
+        results = []
+
+        def run(workers):
+            for _ in range(3):
+                try:
+                    results.append(list(self.db.query(filters, workers=workers)))
+                except Exception as err:
+                    results.append(err)
+
+        threads = [threading.Thread(target=run, args=(workers,)) for workers in (2, 3, 2, 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [expected] * 12)
+
+if __name__ == '__main__':
+    unittest.main()
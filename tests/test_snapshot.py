@@ -0,0 +1,83 @@
+"""Check that an `NEODatabase` survives a round trip through a binary snapshot.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import datetime
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+import snapshot
+from snapshot import load_snapshot, save_snapshot
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.root = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.neofile = self.root / 'neos.csv'
+        self.cadfile = self.root / 'cad.json'
+        shutil.copy(TEST_NEO_FILE, self.neofile)
+        shutil.copy(TEST_CAD_FILE, self.cadfile)
+        self.sources = (self.neofile, self.cadfile)
+        self.path = self.root / 'cad.snapshot'
+
+        self.db = NEODatabase(load_neos(self.neofile), load_approaches(self.cadfile))
+        save_snapshot(self.db, self.path, self.sources)
+
+    def test_restored_database_has_same_neos_and_approaches(self):
+        restored = load_snapshot(self.path, self.sources)
+        self.assertIsNotNone(restored)
+        self.assertEqual([repr(neo) for neo in restored._neos.values()], [repr(neo) for neo in self.db._neos.values()])
+        self.assertEqual([repr(approach) for approach in restored._approaches],
+                         [repr(approach) for approach in self.db._approaches])
+        self.assertEqual(restored.get_neo_by_name('Adonis').designation, '2101')
+
+    def test_restored_database_answers_queries(self):
+        restored = load_snapshot(self.path, self.sources)
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), distance_max=0.1, hazardous=False)
+        self.assertEqual([repr(approach) for approach in restored.query(filters)],
+                         [repr(approach) for approach in self.db.query(filters)])
+        for field, index in self.db._indexes.items():
+            self.assertEqual(restored._indexes[field].rows, index.rows)
+
+    def test_touched_data_file_keeps_snapshot_fresh(self):
+        stat = self.cadfile.stat()
+        os.utime(self.cadfile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNotNone(load_snapshot(self.path, self.sources))
+
+    def test_touched_data_file_is_only_hashed_once(self):
+        stat = self.cadfile.stat()
+        os.utime(self.cadfile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with mock.patch.object(snapshot, '_file_digest', wraps=snapshot._file_digest) as digest:
+            self.assertIsNotNone(load_snapshot(self.path, self.sources))
+            self.assertEqual(digest.call_count, 1)
+            self.assertIsNotNone(load_snapshot(self.path, self.sources))
+            self.assertEqual(digest.call_count, 1)
+
+    def test_changed_data_file_makes_snapshot_stale(self):
+        with open(self.neofile, 'a') as neofile:
+            neofile.write('\n')
+        self.assertIsNone(load_snapshot(self.path, self.sources))
+
+    def test_missing_or_corrupt_snapshot_is_ignored(self):
+        self.assertIsNone(load_snapshot(self.root / 'missing.snapshot', self.sources))
+        self.path.write_bytes(b'not a snapshot')
+        self.assertIsNone(load_snapshot(self.path, self.sources))
+
+
+if __name__ == '__main__':
+    unittest.main()
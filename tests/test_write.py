@@ -226,5 +226,63 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+class TestWriteToCSVBatches(unittest.TestCase):
+    @unittest.mock.patch('write.open')
+    def write(self, results, batch_size, mock_file):
+        with UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_csv(results, None, batch_size=batch_size)
+            return buf.getvalue()
+
+    @staticmethod
+    def expected(results):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(('datetime_utc', 'distance_au', 'velocity_km_s',
+                         'designation', 'name', 'diameter_km', 'potentially_hazardous'))
+        for approach in results:
+            serialized_approach = approach.serialize()
+            serialized_neo = approach.neo.serialize()
+            writer.writerow([serialized_approach['datetime_utc'], serialized_approach['distance_au'],
+                             serialized_approach['velocity_km_s'], serialized_neo['designation'],
+                             serialized_neo['name'], serialized_neo['diameter_km'],
+                             serialized_neo['potentially_hazardous']])
+        return buf.getvalue()
+
+    def test_csv_output_matches_serialized_rows_for_any_batch_size(self):
+        results = build_results(25)
+        for batch_size in (1, 7, 1024):
+            self.assertEqual(self.write(results, batch_size), self.expected(results))
+
+    def test_csv_output_of_no_results_is_only_header(self):
+        self.assertEqual(self.write((), 1), self.expected(()))
+
+
+class TestWriteToJSONStreaming(unittest.TestCase):
+    @unittest.mock.patch('write.open')
+    def write(self, results, buffer_size, mock_file):
+        with UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_json(results, None, buffer_size=buffer_size)
+            return buf.getvalue()
+
+    @staticmethod
+    def expected(results):
+        return json.dumps([{**approach.serialize(), "neo": approach.neo.serialize()}
+                           for approach in results])
+
+    def test_json_output_matches_dumps_for_any_buffer_size(self):
+        results = build_results(25)
+        for buffer_size in (1, 100, 1 << 16):
+            self.assertEqual(self.write(results, buffer_size), self.expected(results))
+
+    def test_json_output_of_no_results_is_empty_list(self):
+        self.assertEqual(self.write((), 1), '[]')
+
+    def test_json_accepts_a_one_shot_iterator(self):
+        results = build_results(3)
+        self.assertEqual(self.write(iter(results), 1), self.expected(results))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -14,33 +14,49 @@ import csv
 import json
 
 
-def write_to_csv(results, filename):
+# The number of characters of output to gather before each write to the file.
+_BUFFER_SIZE = 1 << 16
+
+# The number of CSV rows to gather before handing them to the writer.
+_BATCH_SIZE = 1024
+
+
+def write_to_csv(results, filename, batch_size=_BATCH_SIZE, buffer_size=_BUFFER_SIZE):
     """Write an iterable of `CloseApproach` objects to a CSV file.
 
     The precise output specification is in `README.md`. Roughly, each output row
     corresponds to the information in a single close approach from the `results`
     stream and its associated near-Earth object.
 
+    Rows are built directly as tuples and written in batches of `batch_size`
+    rows through a large file buffer. Since many approaches share an NEO, the
+    NEO's columns are built once per NEO and reused.
+
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
+    :param batch_size: The number of rows to gather before each call to `writerows`.
+    :param buffer_size: The size, in bytes, of the buffer of the output file.
     """
     fieldnames = ('datetime_utc', 'distance_au', 'velocity_km_s',
                   'designation', 'name', 'diameter_km', 'potentially_hazardous')
-    with open(filename, 'w') as csv_out_file:
+    with open(filename, 'w', buffering=buffer_size) as csv_out_file:
         csv_writer = csv.writer(csv_out_file)
         csv_writer.writerow(fieldnames)
+        neo_columns = {}
+        rows = []
         for approach in results:
-            serialized_approach = approach.serialize()
-            serialized_neo = approach.neo.serialize()
-            row = [serialized_approach['datetime_utc'],
-                   serialized_approach['distance_au'], serialized_approach['velocity_km_s'],
-                   serialized_neo['designation'], serialized_neo['name'], serialized_neo[
-                       'diameter_km'], serialized_neo['potentially_hazardous']
-                   ]
-            csv_writer.writerow(row)
+            neo = approach.neo
+            columns = neo_columns.get(neo)
+            if columns is None:
+                columns = neo_columns[neo] = (neo.designation, neo.name or '', neo.diameter, neo.hazardous)
+            rows.append((approach.time_str, approach.distance, approach.velocity) + columns)
+            if len(rows) >= batch_size:
+                csv_writer.writerows(rows)
+                rows.clear()
+        csv_writer.writerows(rows)
 
 
-def write_to_json(results, filename):
+def write_to_json(results, filename, buffer_size=_BUFFER_SIZE):
     """Write an iterable of `CloseApproach` objects to a JSON file.
 
     The precise output specification is in `README.md`. Roughly, the output is a
@@ -48,11 +64,20 @@ def write_to_json(results, filename):
     their values and the 'neo' key mapping to a dictionary of the associated
     NEO's attributes.
 
+    The list is streamed: each element is encoded as it arrives from `results`
+    and written out in batches of about `buffer_size` characters, so memory use
+    doesn't grow with the number of results. The output is identical to
+    encoding the whole list at once with `json.dumps`.
+
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
+    :param buffer_size: The number of characters to gather before each write to the file.
     """
+    encode = json.JSONEncoder().encode
     with open(filename, 'w') as json_out_file:
-        results_array = []
+        pending = ['[']
+        pending_size = 1
+        separator = ''
         for approach in results:
             approach_object = {
                 **approach.serialize(),
@@ -60,5 +85,13 @@ def write_to_json(results, filename):
                     **(approach.neo.serialize())
                 }
             }
-            results_array.append(approach_object)
-        json_out_file.write(json.dumps(results_array))
+            element = separator + encode(approach_object)
+            separator = ', '
+            pending.append(element)
+            pending_size += len(element)
+            if pending_size >= buffer_size:
+                json_out_file.write(''.join(pending))
+                pending.clear()
+                pending_size = 0
+        pending.append(']')
+        json_out_file.write(''.join(pending))